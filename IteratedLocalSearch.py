@@ -10,66 +10,197 @@ the related paper,
 """
 
 # Packages
-from shortest_paths import ShortestPaths
+from shortest_paths import ShortestPaths, BurnedCount, SubtreeScores
+from shortest_paths import TreeChildren, PlaceResource, RemoveResource, RestoreTree
 import numpy as np
+import heapq
+import time
+
+
+# Default parameters, as in mainILS.py
+ILSParameters = {"MultiStarts": 50, "MaxCandidates": 5, "p1": 0.075, "p2": 0.025,
+                 "MaxNeighbours": 20, "MaxModifications": 5, "MaxFailures": 100,
+                 "MaxNoImprovements": 50}
+
+
+# --- Neighbourhood of a single grid node --- #
+def GridNeighbours(n, NodeSet):
+    (i, j) = n
+    return {(i - 1, j), (i + 1, j), (i, j - 1), 
+            (i, j + 1), (i - 1, j - 1), (i + 1, j - 1), 
+            (i - 1, j + 1), (i + 1, j + 1)}.intersection(NodeSet)
+
+
+# ------------------------------------ #
+# --- Bounded resource-move search --- #
+# ------------------------------------ #
+# The move neighbourhood of the ILS local search, for improving placements
+# found elsewhere. Placement is a list of (node, time) pairs. Each round
+# makes the best move of one resource to one of the MaxNeighbours nodes next
+# to the other resources that burn first, for at most MaxRounds rounds.
+# Returns the placement, its objective and its arrival times, which are
+# exact up to the target time or the last deployment time.
+def ImproveByMoves(Nodes, Arcs, InArcs, OutArcs, Placement, ResAtTime, Ignitions,
+                   Delay, ArrivalTimeTarget, MaxNeighbours, MaxRounds,
+                   Committed=frozenset()):
+    NodeSet = set(Nodes)
+    Excluded = set(Committed) | set(Ignitions)
+    Horizon = max(ResAtTime)
+    Placement = dict(Placement)
+    
+    # Objective of the given placement
+    BestObj, ArrivalTime = BurnedCount(
+        Nodes, Arcs, OutArcs, set(Placement), Ignitions, Delay,
+        ArrivalTimeTarget, Horizon=Horizon)
+    
+    for _ in range(MaxRounds):
+        Best = None
+        Cutoff = BestObj - 1
+        
+        # Try moving the resource on n at time tt to nn
+        for n, tt in list(Placement.items()):
+            RemovedHasRes = set(Placement) - {n}
+            RemovedArrivalTime, _, __ = ShortestPaths(
+                Nodes, Arcs, InArcs, OutArcs, RemovedHasRes, Ignitions, Delay)
+            
+            # Next nodes to burn next to the other resources
+            Neighbourhood = set()
+            for i in RemovedHasRes:
+                Neighbourhood |= GridNeighbours(i, NodeSet)
+            Neighbourhood -= RemovedHasRes | Excluded
+            SortedUnburned = sorted([(RemovedArrivalTime[i], i) for i in Neighbourhood
+                                     if RemovedArrivalTime[i] >= tt])
+            
+            for (_, nn) in SortedUnburned[:MaxNeighbours]:
+                ObjAfterMove, AddArrivalTime = BurnedCount(
+                    Nodes, Arcs, OutArcs, RemovedHasRes | {nn}, Ignitions, Delay,
+                    ArrivalTimeTarget, Cutoff, Horizon)
+                if ObjAfterMove > Cutoff:
+                    continue
+                
+                # The other resources must not burn before deployment
+                if any(AddArrivalTime[m] < t for (m, t) in Placement.items() if m != n):
+                    continue
+                
+                Best = (ObjAfterMove, n, nn, AddArrivalTime)
+                Cutoff = ObjAfterMove - 1
+        
+        # Stop when no move improves
+        if Best is None:
+            break
+        BestObj, n, nn, ArrivalTime = Best
+        Placement[nn] = Placement.pop(n)
+    
+    return list(Placement.items()), BestObj, ArrivalTime
 
 
 # ------------------------------------------- #
 # --- Iterated Local Search Metaheuristic --- #
 # ------------------------------------------- #
+#
+# ZStart is an optional starting solution given as a list of (node, time)
+# pairs, it replaces the multistart construction and the resources it
+# leaves unused are placed as in the construction. Committed is a set of
+# nodes that already hold a resource and InArcs and OutArcs can be passed
+# in to reuse them. TimeLimit (seconds) is an optional extra stopping
+# criterion, checked between multistarts and between ILS iterations.
+# Migrate is an optional function called after each ILS iteration with the
+# best solution and its objective. It returns None or a solution and
+# objective from elsewhere, which replaces the best solution if it is better.
+# Log is an optional ConvergenceLog that records every new best objective.
+# Ignitions are a list of nodes or a dict of ignition times (see
+# IgnitionTimes). Random is an optional np.random.RandomState, the global
+# numpy random state is used without it.
+# With MaxScored, the candidates of the local search and of the third
+# pertubation are the MaxScored nodes with the most burned nodes below them
+# in the shortest path tree (see SubtreeScores), without those with none.
 def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
             MultiStarts, p1, p2, MaxNeighbours, MaxModifications, 
-            MaxFailures, MaxNoImprovements, MaxCandidates):
+            MaxFailures, MaxNoImprovements, MaxCandidates, ZStart=None,
+            Committed=None, InArcs=None, OutArcs=None, TimeLimit=None,
+            Migrate=None, Log=None, MaxScored=None, Random=None):
     EPS = 0.0001
+    StartTime = time.time()
+    
+    # Own random state or the global numpy one
+    if Random is None:
+        Random = np.random
+    
+    # Check the time limit
+    def OutOfTime():
+        return TimeLimit is not None and time.time() - StartTime > TimeLimit
+
+    # Resources already on the ground delay the fire on their outarcs
+    if Committed is None:
+        Committed = set()
+    if len(Committed) > 0:
+        Arcs = {a: Arcs[a] + Delay * int(a[0] in Committed) for a in Arcs}
 
     # Generate in- and outarcs
-    InArcs = {n: [] for n in Nodes}
-    OutArcs = {n: [] for n in Nodes}
-    for a in Arcs:
-        OutArcs[a[0]].append((a[0], a[1]))
-        InArcs[a[1]].append((a[0], a[1]))
+    if InArcs is None or OutArcs is None:
+        InArcs = {n: [] for n in Nodes}
+        OutArcs = {n: [] for n in Nodes}
+        for a in Arcs:
+            OutArcs[a[0]].append((a[0], a[1]))
+            InArcs[a[1]].append((a[0], a[1]))
     
     
     #
     # ----------------------------------- #
     # ----- Construct random solution --- #
     # ----------------------------------- #
-    def ConstructRandomSolution(MaxCandidates):
+    # Placement is an optional list of (node, time) pairs to complete,
+    # pairs beyond the resources available at their time are dropped
+    def ConstructRandomSolution(MaxCandidates, Placement=None):
         
         # Initial zero solution
         ZSol = {(n, t): 0 for n in Nodes for t in ResAtTime}
+        Used = {t: 0 for t in ResAtTime}
+        
+        # Resources of the given placement
+        Incumbent = set()
+        for (n, t) in Placement or []:
+            if t in ResAtTime and Used[t] < ResAtTime[t] and n not in Incumbent:
+                ZSol[n, t] = 1
+                Used[t] += 1
+                Incumbent.add(n)
+        
+        # Arrival times and shortest path tree with these resources,
+        # updated below the new resource each time one is added
+        ArrivalTime, _, Pred = ShortestPaths(
+            Nodes, Arcs, InArcs, OutArcs, Incumbent, Ignitions, Delay)
+        Children = TreeChildren(Nodes, Pred)
         
         # Add resources until all added
-        while sum(ZSol.values()) < sum(ResAtTime.values()):
+        while sum(Used.values()) < sum(ResAtTime.values()):
             
             # Get the earliest release time  of an available resource
-            tt = min(t for (n, t) in ZSol if sum(
-                ZSol[n, t] for n in Nodes) < ResAtTime[t])
-            
-            # Get nodes with res
-            Incumbent = set(n for n in Nodes for t in ResAtTime if ZSol[n, t] > .5)
-            
-            # Run Dijkstra to get arrival times
-            ArrivalTime, _, __ = ShortestPaths(
-                Nodes, Arcs, InArcs, OutArcs, Incumbent, Ignitions, Delay)
+            tt = min(t for t in ResAtTime if Used[t] < ResAtTime[t])
             
             # Identify unburned nodes at time tt in order of arrival time
-            Unburned = sorted([(ArrivalTime[n], n) for n in Nodes
-                               if ArrivalTime[n] >= tt and not
-                               any(ZSol[n, t] > 0.5 for t in ResAtTime)])
+            Unburned = heapq.nsmallest(MaxCandidates, [
+                (ArrivalTime[n], n) for n in Nodes
+                if ArrivalTime[n] >= tt and n not in Committed and n not in Incumbent])
             
             
             # Get candidate nodes
-            Candidates = [n for (a, n) in Unburned][:MaxCandidates]
+            Candidates = [n for (a, n) in Unburned]
             # Get the nodes that will burn first if there is no change
             # minArrival = min(_[0] for _ in Unburned)
             # Candidates = [n for (a, n) in Unburned if a < minArrival + EPS]
             
+            # Everything burns before the remaining resources arrive
+            if len(Candidates) == 0:
+                break
+            
             # Chose a random candidate node
-            Choice = Candidates[np.random.randint(len(Candidates))]
+            Choice = Candidates[Random.randint(len(Candidates))]
             
             # Add a resource to the chosen node at the chosen
             ZSol[Choice, tt] = 1
+            Used[tt] += 1
+            PlaceResource(Arcs, InArcs, OutArcs, ArrivalTime, Pred, Children,
+                          Incumbent, Choice, Delay)
         
         return ZSol
     
@@ -84,27 +215,24 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
         ZSolBest = ConstructRandomSolution(MaxCandidates)
         
         # Evaluate initial solution
-        ArrivalTime, _, __ = ShortestPaths(
-            Nodes, Arcs, InArcs, OutArcs, set(
+        objBest, _ = BurnedCount(
+            Nodes, Arcs, OutArcs, set(
                 n for n in Nodes for t in ResAtTime 
-                if ZSolBest[n, t] > .5), Ignitions, Delay)
-        
-        # Starting best objective value
-        objBest = len([n for n in Nodes if ArrivalTime[n] < ArrivalTimeTarget])
+                if ZSolBest[n, t] > .5), Ignitions, Delay, ArrivalTimeTarget)
 
         for _ in range(Iterations - 1):
+            if OutOfTime():
+                break
             
             # Construct a random solution
             ZSol = ConstructRandomSolution(MaxCandidates)
             
-            # Evaluate random solution
-            ArrivalTime, _, __ = ShortestPaths(
-                Nodes, Arcs, InArcs, OutArcs, set(
+            # Evaluate random solution, stopping once it is no better
+            objNew, _ = BurnedCount(
+                Nodes, Arcs, OutArcs, set(
                     n for n in Nodes for t in ResAtTime 
-                    if ZSol[n, t] > .5), Ignitions, Delay)
-        
-            # Calculate objective value
-            objNew = len([n for n in Nodes if ArrivalTime[n] < ArrivalTimeTarget])
+                    if ZSol[n, t] > .5), Ignitions, Delay, ArrivalTimeTarget,
+                objBest - 1)
             
             # Check if better
             if objNew < objBest:
@@ -117,11 +245,17 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
 
 
     # --- Neighbourhood of a single node --- #
+    NodeSet = set(Nodes)
     def NeighOneNode(n):
-        (i, j) = n
-        return {(i - 1, j), (i + 1, j), (i, j - 1), 
-                (i, j + 1), (i - 1, j - 1), (i + 1, j - 1), 
-                (i - 1, j + 1), (i + 1, j + 1)}.intersection(set(Nodes))
+        return GridNeighbours(n, NodeSet)
+    
+    
+    # --- Candidates that can save burned nodes --- #
+    # Candidates in the given order, the best scored first
+    def TopScored(Candidates, ArrivalTime, Children):
+        Score = SubtreeScores(Candidates, ArrivalTime, Children, ArrivalTimeTarget)
+        Scored = [n for n in Candidates if Score[n] > 0]
+        return sorted(Scored, key=lambda n: -Score[n])[:MaxScored]
     
     
 
@@ -142,11 +276,17 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
             # The current set of nodes with a resource
             HasRes = set(n for n in Nodes for t in ResAtTime if ZSol[n, t] > .5)
         
-            # Current arrival times and objective values
-            ArrivalTime, _, __ = ShortestPaths(Nodes, Arcs, InArcs, OutArcs, HasRes, Ignitions, Delay)
-            
             # Current best objective value
-            BestObj = len([n for n in Nodes if ArrivalTime[n] < ArrivalTimeTarget])
+            BestObj, _ = BurnedCount(
+                Nodes, Arcs, OutArcs, HasRes, Ignitions, Delay, ArrivalTimeTarget)
+            
+            # Arrival times and shortest path tree with all resources. Each
+            # removal below updates them where the fire gets faster and is
+            # undone before the next one.
+            ArrivalTime, _, Pred = ShortestPaths(
+                Nodes, Arcs, InArcs, OutArcs, HasRes, Ignitions, Delay)
+            Children = TreeChildren(Nodes, Pred)
+            Placed = set(HasRes)
             
             # For each node with a resource we try moving that resource
             # to another node. Here n is the node we removed a resource from
@@ -159,23 +299,26 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
                 RemovedHasRes = HasRes - {n}
                 
                 # Get arrival times after removal of n
-                RemovedArrivalTime, _, __ = ShortestPaths(
-                    Nodes, Arcs, InArcs, OutArcs, RemovedHasRes, Ignitions, Delay)
+                Changes = RemoveResource(Arcs, OutArcs, ArrivalTime, Pred, Children,
+                                         Placed, n, Delay)
                 
                 # Create extended neighbourhood of 
                 # the nodes that still have resources
                 Neighbourhood = set()
                 for i in list(RemovedHasRes):
                     Neighbourhood |= NeighOneNode(i)
-                Neighbourhood -= RemovedHasRes
+                Neighbourhood -= RemovedHasRes | Committed
                 
                 # Get the sorted neighbours that are not burned yet at time tt
-                SortedUnburned = sorted([(RemovedArrivalTime[i], i) for i in Neighbourhood
-                                   if RemovedArrivalTime[i] >= tt])
+                SortedUnburned = sorted([(ArrivalTime[i], i) for i in Neighbourhood
+                                   if ArrivalTime[i] >= tt])
                 
                 # Keep only the next nodes to burn in the neihbourhood
                 Neighbourhood = [i for (_, i) in SortedUnburned]
+                if MaxScored is not None:
+                    Neighbourhood = TopScored(Neighbourhood, ArrivalTime, Children)
                 Neighbourhood = Neighbourhood[:MaxNeighbours]
+                RestoreTree(Changes, ArrivalTime, Pred, Children, Placed, n)
                 
                 # Iterate the extended neighbours
                 # nn is the node we try adding to
@@ -184,9 +327,14 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
                     # Nodes with resource after adding one to nn
                     AddHasRes = RemovedHasRes | {nn}
                     
-                    # Get arrival times after adding the resource
-                    AddArrivalTime, _, __ = ShortestPaths(
-                        Nodes, Arcs, InArcs, OutArcs, AddHasRes, Ignitions, Delay)
+                    # Objective after the move, the evaluation stops as soon
+                    # as the move cannot improve. Arrival times are exact up
+                    # to the last deployment time for the feasibility check.
+                    ObjAfterMove, AddArrivalTime = BurnedCount(
+                        Nodes, Arcs, OutArcs, AddHasRes, Ignitions, Delay,
+                        ArrivalTimeTarget, BestObj - Improvement - 1, max(ResAtTime))
+                    if ObjAfterMove > BestObj - Improvement - 1:
+                        continue
                     
                     # Evaluate feasibility of the move
                     INFEASIBLE = False
@@ -201,9 +349,6 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
                     if INFEASIBLE:
                         continue
                     
-                    # Otherwise check the objective value
-                    ObjAfterMove = len([i for i in Nodes if AddArrivalTime[i] < ArrivalTimeTarget])
-                    
                     # If the objective is better then update the solution
                     NextImprovement = BestObj - ObjAfterMove
                     if NextImprovement > Improvement:
@@ -232,7 +377,7 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
         
         tMax = max(_[1] for _ in ZSolNew if ZSolNew[_] > 0.5)
         tNodes = [n for (n, t) in ZSolNew if ZSolNew[n, t] > 0.5 and t == tMax]
-        nChoice = tNodes[np.random.randint(len(tNodes))]
+        nChoice = tNodes[Random.randint(len(tNodes))]
         ZSolNew[nChoice, tMax] = 0
         return ZSolNew
     
@@ -248,27 +393,28 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
             return ZSol
         
         # Get the earliest release time  of an available resource
-        tt = min(t for (n, t) in ZSolNew if sum(
-            ZSolNew[n, t] for n in Nodes) < ResAtTime[t])
+        Used = {t: 0 for t in ResAtTime}
+        for (n, t) in ZSolNew:
+            Used[t] += ZSolNew[n, t]
+        tt = min(t for t in ResAtTime if Used[t] < ResAtTime[t])
         
         # Get nodes with resources
-        Incumbent = set(n for n in Nodes for t in ResAtTime if ZSolNew[n, t] > .5)
+        Incumbent = set(n for (n, t) in ZSolNew if ZSolNew[n, t] > .5)
         
         # Run Dijkstra to get arrival times
         ArrivalTime, _, __ = ShortestPaths(
             Nodes, Arcs, InArcs, OutArcs, Incumbent, Ignitions, Delay)
         
         # Identify candidate nodes for a new resource
-        Unburned = sorted([(ArrivalTime[n], n) for n in Nodes
-                           if ArrivalTime[n] >= tt and not
-                           any(ZSolNew[n, t] > 0.5 for t in ResAtTime)])
+        Unburned = [(ArrivalTime[n], n) for n in Nodes
+                    if ArrivalTime[n] >= tt and n not in Committed and n not in Incumbent]
 
         # Get the nodes that will burn first if there is no change
         minArrival = min(_[0] for _ in Unburned)
-        Candidates = [n for (a, n) in Unburned if a < minArrival + EPS]
+        Candidates = [n for (a, n) in sorted(Unburned) if a < minArrival + EPS]
         
         # Chose a random candidate node
-        Choice = Candidates[np.random.randint(len(Candidates))]
+        Choice = Candidates[Random.randint(len(Candidates))]
         
         # Add a resource to the chosen node at the chosen
         ZSolNew[Choice, tt] = 1
@@ -286,20 +432,23 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
             
             # Get nodes with resources
             HasResource = set(n for n in Nodes for t in ResAtTime if ZSolNew[n, t] > .5)
+            if len(HasResource) == 0:
+                break
             
             # print(HasResource)
-            n = list(HasResource)[np.random.randint(len(HasResource))]
+            n = list(HasResource)[Random.randint(len(HasResource))]
             tt = min(t for (nn, t) in ZSolNew if nn == n and ZSolNew[n, t] > 0.5)
 
             # Set of nodes with resources after we remove n
             RemovedHasRes = HasResource - {n}
             
             # Get arrival times after removal of n
-            RemovedArrivalTime, _, __ = ShortestPaths(
+            RemovedArrivalTime, _, RemovedPred = ShortestPaths(
                 Nodes, Arcs, InArcs, OutArcs, RemovedHasRes, Ignitions, Delay)
             
             # Create a broader neighbourhood of candidate nodes
-            Neighbourhood = [nn for nn in Nodes if nn != n and ZSolNew[nn, tt] < 0.5]
+            Neighbourhood = [nn for nn in Nodes if nn != n and ZSolNew[nn, tt] < 0.5
+                             and nn not in Committed]
             
             # Get the sorted neighbours that are not burned yet at time tt
             SortedUnburned = sorted([(RemovedArrivalTime[i], i) for i in Neighbourhood
@@ -307,10 +456,14 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
             
             # Get the "MaxNeighbours" next nodes that burn if no change
             Candidates = [n for (a, n) in SortedUnburned]
+            if MaxScored is not None:
+                Candidates = TopScored(
+                    Candidates, RemovedArrivalTime,
+                    TreeChildren(Nodes, RemovedPred)) or Candidates
             Candidates = Candidates[:MaxNeighbours]
             
             # Chose a random candidate node
-            Choice = Candidates[np.random.randint(len(Candidates))]
+            Choice = Candidates[Random.randint(len(Candidates))]
             
             # Add the resource to HasRes
             AddHasRes = RemovedHasRes | {Choice}
@@ -354,7 +507,7 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
             p2 = 0
             
         # Chose a pertubation
-        Rand = np.random.random()
+        Rand = Random.random()
         if Rand < p1:
             return Pertubation1(ZSol)
         else:
@@ -373,15 +526,19 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
         NoImprovements = 0
         
         # Get starting solution
-        print("Generating multistart solution")
-        ZSolBest = MultiStartConstructiveHeuristic(MultiStarts, MaxCandidates)
+        if ZStart is not None:
+            # Complete the starting solution up to ResAtTime
+            ZSolBest = ConstructRandomSolution(MaxCandidates, ZStart)
+        else:
+            print("Generating multistart solution")
+            ZSolBest = MultiStartConstructiveHeuristic(MultiStarts, MaxCandidates)
         
         # Evaluate starting solution
         HasRes = set(n for (n, t) in ZSolBest if ZSolBest[n, t] > 0.5)
-        ArrivalTime, _, __ = ShortestPaths(
-            Nodes, Arcs, InArcs, OutArcs, HasRes, Ignitions, Delay)
-        ObjVal = len([n for n in Nodes if ArrivalTime[n] < ArrivalTimeTarget])
-        
+        ObjVal, _ = BurnedCount(
+            Nodes, Arcs, OutArcs, HasRes, Ignitions, Delay, ArrivalTimeTarget)
+        if Log is not None:
+            Log.Record("ILS", ObjVal, None)
         
         
         # Initial local search
@@ -399,11 +556,11 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
             # Local search from perturbed solution
             ZSolTemp = LocalSearch(ZSolTemp)        
             
-            # Evaluate new solution
+            # Evaluate new solution, stopping once it is no better
             HasRes = set(n for (n, t) in ZSolTemp if ZSolTemp[n, t] > 0.5)
-            ArrivalTime, _, __ = ShortestPaths(
-                Nodes, Arcs, InArcs, OutArcs, HasRes, Ignitions, Delay)
-            NewObjVal = len([n for n in Nodes if ArrivalTime[n] < ArrivalTimeTarget])
+            NewObjVal, _ = BurnedCount(
+                Nodes, Arcs, OutArcs, HasRes, Ignitions, Delay,
+                ArrivalTimeTarget, ObjVal - 1)
             
             
             # Check if better
@@ -413,15 +570,28 @@ def FireILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
                 NoImprovements = 0
                 ZSolBest = {(n, t): ZSolTemp[n, t] for (n, t) in ZSolTemp}
                 ObjVal = NewObjVal
+                if Log is not None:
+                    Log.Record("ILS", ObjVal, None)
                 
             # Otherwise iterate the
             else:  # stopping criteria
                 NoImprovements += 1
+            
+            # Exchange solutions with other runs
+            if Migrate is not None:
+                Migrant = Migrate(ZSolBest, ObjVal)
+                if Migrant is not None and Migrant[1] < ObjVal:
+                    ZSolBest, ObjVal = Migrant
+                    NoImprovements = 0
+                    if Log is not None:
+                        Log.Record("ILS", ObjVal, None)
                 
             # Check the stopping criterion
-            if NoImprovements >= MaxNoImprovements:
+            if NoImprovements >= MaxNoImprovements or OutOfTime():
                 Stop = True
 
+        if Log is not None:
+            Log.Flush()
         return ZSolBest, ObjVal
             
             
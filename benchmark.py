@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+Local benchmark suite
+
+Micro benchmarks (shortest paths, ILS move evaluation, LBBD callback latency,
+model build times) and macro benchmarks (end-to-end solves on a fixed subset
+of the small instances). Every case runs in a fresh process so that the peak
+RSS is measured per case. Results are compared against a stored baseline:
+slower cases, higher peak RSS and any change in the objective values or in
+the number of feasible placements are flagged as regressions.
+
+Timings depend on the machine, so no baseline is shipped. Write one on the
+machine you benchmark on before changing the code, with the same options
+you compare with later:
+
+    python benchmark.py --write-baseline          # run and store the baseline
+    python benchmark.py                           # run and compare against it
+    python benchmark.py --quick --write-baseline  # small sizes only
+    python benchmark.py --only Shortest           # run the cases whose name matches
+
+"""
+
+# Packages
+from parameters import ParametersSmall
+from shortest_paths import ShortestPaths, BurnedCount
+from generator import GenerateLandscape
+from ast import literal_eval
+from pathlib import Path
+import multiprocessing as mp
+import numpy as np
+import argparse
+import resource
+import queue
+import json
+import time
+import sys
+
+
+def Load(Instance):
+    with open(Instance, 'r') as file:
+        Data = json.load(file)
+        Delay = Data["Delay"]
+        ArrivalTimeTarget = Data["ArrivalTimeTarget"]
+        ResAtTime = {literal_eval(t): Data["ResAtTime"][t] for t in Data["ResAtTime"]}
+        Ignitions = [tuple(n) for n in Data["Ignitions"]]
+        N = [tuple(n) for n in Data["Nodes"]]
+        A = {literal_eval(a): Data["Arcs"][a] for a in Data["Arcs"]}
+
+    return N, A, Ignitions, Delay, ArrivalTimeTarget, ResAtTime
+
+
+# ----------------------- #
+# --- Synthetic grids --- #
+# ----------------------- #
+def GridInstance(Size, Seed):
+    return GenerateLandscape(
+        Size, Size, 8, "uniform", (1 / 3, 1), 1, 5, Size,
+        {Size // 2: max(1, Size // 5), Size: max(1, Size // 5)}, Seed)
+
+
+def ArcLists(N, A):
+    InArcs = {n: [] for n in N}
+    OutArcs = {n: [] for n in N}
+    for a in A:
+        OutArcs[a[0]].append((a[0], a[1]))
+        InArcs[a[1]].append((a[0], a[1]))
+    return InArcs, OutArcs
+
+
+# ------------------------ #
+# --- Micro benchmarks --- #
+# ------------------------ #
+def BenchShortestPaths(Size, Repeats):
+    N, A, Ignitions, Delay, _, __ = GridInstance(Size, 0)
+    InArcs, OutArcs = ArcLists(N, A)
+
+    # Best of the repeats
+    Times = []
+    for _ in range(Repeats):
+        Start = time.perf_counter()
+        ShortestPaths(N, A, InArcs, OutArcs, set(), Ignitions, Delay)
+        Times.append(time.perf_counter() - Start)
+    return {"Time": min(Times)}
+
+
+# One ILS move: evaluate a perturbed placement, check feasibility of
+# the deployed resources and count the burned nodes
+def BenchMoveEvaluation(Size, Repeats):
+    N, A, Ignitions, Delay, ArrivalTimeTarget, ResAtTime = GridInstance(Size, 0)
+    InArcs, OutArcs = ArcLists(N, A)
+    Random = np.random.RandomState(0)
+    Free = [n for n in N if n not in Ignitions]
+    Placements = [[Free[k] for k in Random.choice(
+        len(Free), sum(ResAtTime.values()), replace=False)] for _ in range(Repeats)]
+
+    # Best of the repeats, the objectives and feasible placements are summed
+    Times, ObjVal, Feasible = [], 0, 0
+    for Placement in Placements:
+        Start = time.perf_counter()
+        ArrivalTime, _, __ = ShortestPaths(
+            N, A, InArcs, OutArcs, set(Placement), Ignitions, Delay)
+        IsFeasible = all(ArrivalTime[n] >= min(ResAtTime) for n in Placement)
+        Burned = len([n for n in N if ArrivalTime[n] < ArrivalTimeTarget])
+        Times.append(time.perf_counter() - Start)
+        ObjVal += Burned
+        Feasible += IsFeasible
+    return {"Time": min(Times), "ObjVal": ObjVal, "Feasible": Feasible}
+
+
+# The same moves evaluated with the bound-pruned objective,
+# the cutoff is the objective of the first placement
+def BenchPrunedMoveEvaluation(Size, Repeats):
+    N, A, Ignitions, Delay, ArrivalTimeTarget, ResAtTime = GridInstance(Size, 0)
+    InArcs, OutArcs = ArcLists(N, A)
+    Random = np.random.RandomState(0)
+    Free = [n for n in N if n not in Ignitions]
+    Placements = [[Free[k] for k in Random.choice(
+        len(Free), sum(ResAtTime.values()), replace=False)] for _ in range(Repeats)]
+    Cutoff, _ = BurnedCount(N, A, OutArcs, set(Placements[0]), Ignitions,
+                            Delay, ArrivalTimeTarget)
+
+    # Best of the repeats, the objectives and feasible placements are summed
+    Times, ObjVal, Feasible = [], 0, 0
+    for Placement in Placements:
+        Start = time.perf_counter()
+        Burned, ArrivalTime = BurnedCount(
+            N, A, OutArcs, set(Placement), Ignitions, Delay, ArrivalTimeTarget,
+            Cutoff - 1, max(ResAtTime))
+        IsFeasible = all(ArrivalTime[n] >= min(ResAtTime) for n in Placement)
+        Times.append(time.perf_counter() - Start)
+        ObjVal += Burned
+        Feasible += IsFeasible
+    return {"Time": min(Times), "ObjVal": ObjVal, "Feasible": Feasible}
+
+
+# Wall time from entering a model function until its first optimize
+def BenchModelBuild(Method, Size):
+    import gurobipy as gp
+    FirstOptimize = []
+
+    class BuildTimer(gp.Model):
+        def optimize(self, *args):
+            FirstOptimize.append(time.perf_counter())
+            return super().optimize(*args)
+    gp.Model = BuildTimer
+
+    # Imported before the timer starts, so the build time excludes them
+    from model_MIP import FireMIP, FireMIPMatrix
+    from model_LBBD import FireLBBD
+
+    N, A, Ignitions, Delay, ArrivalTimeTarget, ResAtTime = GridInstance(Size, 0)
+    Start = time.perf_counter()
+    try:
+        if Method == "MIP":
+            FireMIP(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, 1, 0)
+        elif Method == "MIPMatrix":
+            FireMIPMatrix(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, 1, 0)
+        else:
+            FireLBBD(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
+                     1, 0, [], False)
+    except gp.GurobiError:
+        pass  # No incumbent within the time limit
+    return {"Time": FirstOptimize[0] - Start}
+
+
+def BenchCallback(Size, TimeLimit):
+    from model_LBBD import FireLBBD
+    N, A, Ignitions, Delay, ArrivalTimeTarget, ResAtTime = GridInstance(Size, 0)
+    Model, _ = FireLBBD(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
+                        TimeLimit, 0, None, False)
+    return {"Time": Model._CallbackTime / max(1, Model._Callbacks),
+            "Callbacks": Model._Callbacks}
+
+
+# ------------------------ #
+# --- Macro benchmarks --- #
+# ------------------------ #
+def BenchSolve(Method, Index, TimeLimit):
+    (Size, n1, n2) = ParametersSmall()[Index]
+    Instance = Path(__file__).parent / f"instances/small/{Size}/S{n1}_{n2}.json"
+    N, A, Ignitions, Delay, ArrivalTimeTarget, ResAtTime = Load(Instance)
+    from IteratedLocalSearch import FireILS
+    from model_MIP import FireMIP
+    from model_LBBD import FireLBBD
+
+    Start = time.perf_counter()
+    if Method == "ILS":
+        np.random.seed(0)
+        _, ObjVal = FireILS(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
+                            50, 0.075, 0.025, 20, 5, 100, 50, 5)
+    elif Method == "MIP":
+        ObjVal = FireMIP(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
+                         TimeLimit, 0).objVal
+    else:
+        ObjVal = FireLBBD(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
+                          TimeLimit, 0, None, False)[0].objVal
+    return {"Time": time.perf_counter() - Start, "ObjVal": round(ObjVal)}
+
+
+# Fixed subset of the small instances: the first instance of each size
+SolveInstances = [0, 80, 160]
+
+
+def Cases(Quick, TimeLimit):
+    Grids = [25, 50] if Quick else [50, 100, 200, 400]
+    Models = [6] if Quick else [10, 20, 30]
+
+    Cases = []
+    for Size in Grids:
+        Cases.append((f"ShortestPaths grid {Size}", BenchShortestPaths, (Size, 5)))
+    for Size in Grids:
+        Cases.append((f"ILS move grid {Size}", BenchMoveEvaluation, (Size, 5)))
+    for Size in Grids:
+        Cases.append((f"ILS pruned move grid {Size}", BenchPrunedMoveEvaluation, (Size, 5)))
+    for Size in Models:
+        Cases.append((f"LBBD callback grid {Size}", BenchCallback, (Size, TimeLimit)))
+    for Method in ["MIP", "MIPMatrix", "LBBD"]:
+        for Size in Models:
+            Cases.append((f"{Method} build grid {Size}", BenchModelBuild, (Method, Size)))
+
+    # End-to-end solves need the extracted instances
+    if (Path(__file__).parent / "instances/small").exists():
+        for Method in ["ILS", "LBBD", "MIP"]:
+            for Index in SolveInstances:
+                Cases.append((f"{Method} solve instance {Index}", BenchSolve,
+                              (Method, Index, TimeLimit)))
+    else:
+        print("instances/small not found, skipping end-to-end solves")
+
+    return Cases
+
+
+# ------------------- #
+# --- Measurement --- #
+# ------------------- #
+def PeakRSS():
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    Peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return Peak / 2**20
+    return Peak / 2**10
+
+
+def RunCase(Function, Args, Results):
+    try:
+        Output = Function(*Args)
+        Output["RSS"] = PeakRSS()
+    except Exception as Error:
+        Output = {"Error": f"{type(Error).__name__}: {Error}"}
+    Results.put(Output)
+
+
+# Run a case in a fresh process to get its own peak RSS. A case that
+# raises, dies or runs past Timeout seconds is returned with an Error.
+def Measure(Function, Args, Timeout=None):
+    Context = mp.get_context("spawn")
+    Results = Context.Queue()
+    Process = Context.Process(target=RunCase, args=(Function, Args, Results))
+    Process.start()
+    Start = time.perf_counter()
+    while True:
+        try:
+            Output = Results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not Process.is_alive():
+                Output = {"Error": f"exited with code {Process.exitcode}"}
+                break
+            if Timeout is not None and time.perf_counter() - Start > Timeout:
+                Process.terminate()
+                Output = {"Error": f"no result within {Timeout} s"}
+                break
+    Process.join()
+    return Output
+
+
+# Results that must match the baseline exactly
+Checked = ["ObjVal", "Feasible"]
+
+
+def Compare(Results, Baseline, Tolerance):
+    Regressions = []
+    print(f"{'Case':<32}{'Time (s)':>12}{'RSS (MB)':>12}{'Base (s)':>12}"
+          f"{'Base (MB)':>12}  Status")
+    for Name in Results:
+        Now = Results[Name]
+        if "Error" in Now:
+            print(f"{Name:<32}  FAILED: {Now['Error']}")
+            continue
+        Base = Baseline.get(Name)
+        Status = "new"
+        if Base is not None:
+            Status = "ok"
+            if Now["Time"] > Base["Time"] * (1 + Tolerance):
+                Status = "SLOWER"
+            if Now["RSS"] > Base["RSS"] * (1 + Tolerance):
+                Status = "SLOWER, MORE MEMORY" if Status == "SLOWER" else "MORE MEMORY"
+            Changed = [f"{Key} {Base[Key]} -> {Now.get(Key)}" for Key in Checked
+                       if Key in Base and Now.get(Key) != Base[Key]]
+            if Changed:
+                Status = ", ".join(([] if Status == "ok" else [Status]) + Changed)
+            if Status != "ok":
+                Regressions.append(Name)
+        print(f"{Name:<32}{Now['Time']:>12.4f}{Now['RSS']:>12.1f}"
+              f"{Base['Time'] if Base else float('nan'):>12.4f}"
+              f"{Base['RSS'] if Base else float('nan'):>12.1f}  {Status}")
+    return Regressions
+
+
+if __name__ == "__main__":
+    Parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    Parser.add_argument("--quick", action="store_true", help="small sizes only")
+    Parser.add_argument("--only", default="", help="run cases whose name contains this")
+    Parser.add_argument("--write-baseline", "--save", action="store_true", dest="save",
+                        help="store the results as the baseline")
+    Parser.add_argument("--baseline", default=Path(__file__).parent / "benchmarks/baseline.json",
+                        type=Path, help="baseline file")
+    Parser.add_argument("--tolerance", default=0.25, type=float,
+                        help="relative slowdown or memory growth flagged as a regression")
+    Parser.add_argument("--time-limit", default=60, type=float,
+                        help="Gurobi time limit for the solver cases")
+    Parser.add_argument("--case-timeout", default=3600, type=float,
+                        help="seconds after which a case is stopped and marked failed")
+    Args = Parser.parse_args()
+    if not Args.save and not Args.baseline.exists():
+        Parser.error(f"no baseline at {Args.baseline}, "
+                     f"write one first with --write-baseline")
+
+    # Run cases
+    Results = {}
+    for (Name, Function, FunctionArgs) in Cases(Args.quick, Args.time_limit):
+        if Args.only in Name:
+            Results[Name] = Measure(Function, FunctionArgs, Args.case_timeout)
+
+    # Compare with the baseline
+    Baseline = {}
+    if Args.baseline.exists():
+        with open(Args.baseline, 'r') as file:
+            Baseline = json.load(file)
+    Regressions = Compare(Results, Baseline, Args.tolerance)
+
+    # Store the baseline
+    if Args.save:
+        Args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(Args.baseline, 'w') as file:
+            json.dump({**Baseline, **{Name: Results[Name] for Name in Results
+                                      if "Error" not in Results[Name]}}, file, indent=2)
+        print(f"Baseline written to {Args.baseline}")
+    Failures = [Name for Name in Results if "Error" in Results[Name]]
+    if Failures:
+        print(f"{len(Failures)} case(s) failed")
+        sys.exit(1)
+    elif Regressions and not Args.save:
+        print(f"{len(Regressions)} regression(s) against {Args.baseline}")
+        sys.exit(1)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Resource budget sweeps on one LBBD model
+
+The fire path cuts do not depend on how many resources arrive at each time,
+only on the times themselves. A model from BuildLBBD can therefore be solved
+for a list of budgets by changing the right hand sides of ResPerTime,
+keeping every cut found so far, with the solution of the previous budget
+(trimmed to the new one) as starting solution.
+
+"""
+
+# Packages
+from rolling_horizon import ShiftedStart
+from model_LBBD import SolveLBBD
+
+
+# ------------------------- #
+# --- Sweep the budgets --- #
+# ------------------------- #
+# Budgets is a list of ResAtTime dicts over the times of the model, a
+# missing time has no resources. Returns one (budget, objective, bound,
+# runtime, placement) tuple per budget.
+def SweepLBBD(Model, Budgets, Heuristic=False):
+    Results = []
+    Previous = []
+    for Budget in Budgets:
+        if not set(Budget) <= set(Model._ResPerTime):
+            raise ValueError(f"Budget times {sorted(set(Budget) - set(Model._ResPerTime))} "
+                             "are not times of the model")
+        ResAtTime = {t: Budget.get(t, 0) for t in Model._ResPerTime}
+
+        # New right hand sides
+        for t in ResAtTime:
+            Model._ResPerTime[t].RHS = ResAtTime[t]
+        Model._ResAtTime = ResAtTime
+
+        # Previous solution within the new budget
+        ZStart = ShiftedStart(Model._Nodes, Model._DelayedArcs, Model._InArcs,
+                              Model._OutArcs, Previous, Model._Ignitions, set(),
+                              ResAtTime, Model._Delay, 0)
+
+        Model, Previous = SolveLBBD(Model, ZStart, Heuristic)
+        Results.append((ResAtTime, Model.objVal, Model.ObjBound, Model.RunTime, Previous))
+
+    return Results
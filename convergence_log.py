@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Convergence logs
+
+Timelines of the incumbent and the bound of a run, one JSON record per line,
+
+    {"method": "LBBD", "time": 12.3, "incumbent": 51, "bound": 47.0,
+     "cuts": 120, "shortest_paths": 35}
+
+with the time in seconds since the log was opened. Records are kept in
+memory and written in batches, and a record that repeats the previous one
+of its method is skipped, so logging from a callback stays cheap.
+
+"""
+
+# Packages
+from pathlib import Path
+import json
+import time
+
+
+class ConvergenceLog:
+    def __init__(self, File, BufferSize=1000):
+        Path(File).parent.mkdir(parents=True, exist_ok=True)
+        self.File = open(File, 'a')
+        self.BufferSize = BufferSize
+        self.Buffer = []
+        self.Last = {}
+        self.StartTime = time.perf_counter()
+
+    # Incumbent and bound are None if there are none yet
+    def Record(self, Method, Incumbent, Bound, **Extra):
+        if Incumbent is not None and abs(Incumbent) >= 1e100:
+            Incumbent = None
+        if Bound is not None and abs(Bound) >= 1e100:
+            Bound = None
+        Values = (Incumbent, Bound, *Extra.values())
+        if self.Last.get(Method) == Values:
+            return
+        self.Last[Method] = Values
+
+        self.Buffer.append({"method": Method, "time": time.perf_counter() - self.StartTime,
+                            "incumbent": Incumbent, "bound": Bound, **Extra})
+        if len(self.Buffer) >= self.BufferSize:
+            self.Flush()
+
+    def Flush(self):
+        for Record in self.Buffer:
+            self.File.write(json.dumps(Record) + "\n")
+        self.File.flush()
+        self.Buffer = []
+
+    def Close(self):
+        self.Flush()
+        self.File.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.Close()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk store of the fire paths behind the LBBD optimality cuts
+
+The cuts only depend on the graph, the ignitions, Delay and
+ArrivalTimeTarget, so the fire paths are stored under a hash of those and
+turned back into cuts by FireLBBD for any budget, seed or time limit.
+
+"""
+
+# Packages
+from pathlib import Path
+import hashlib
+import json
+import os
+
+
+# Hash of the instance data the cuts depend on
+def InstanceHash(Nodes, Arcs, Ignitions, Delay, ArrivalTimeTarget):
+    Hash = hashlib.sha256()
+    Hash.update(repr((Delay, ArrivalTimeTarget, sorted(Ignitions))).encode())
+    Hash.update(repr(sorted(Nodes)).encode())
+    Hash.update(repr(sorted(Arcs.items())).encode())
+    return Hash.hexdigest()
+
+
+def LoadFirePaths(Folder, Hash):
+    File = Path(Folder) / f"{Hash}.json"
+    if not File.exists():
+        return []
+    with open(File, 'r') as file:
+        return [[tuple(n) for n in FirePath] for FirePath in json.load(file)]
+
+
+# Add fire paths to the store, without duplicates
+def SaveFirePaths(Folder, Hash, FirePaths):
+    Folder = Path(Folder)
+    Folder.mkdir(parents=True, exist_ok=True)
+    Stored = set(tuple(FirePath) for FirePath in LoadFirePaths(Folder, Hash))
+    Stored |= set(tuple(tuple(n) for n in FirePath) for FirePath in FirePaths)
+
+    # Write to a temporary file first so an interrupted run keeps the old store
+    Temp = Folder / f"{Hash}.json.tmp"
+    with open(Temp, 'w') as file:
+        json.dump(sorted(Stored, key=len), file)
+    os.replace(Temp, Folder / f"{Hash}.json")
+
+    return len(Stored)
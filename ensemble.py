@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Scenario ensembles of arc weights
+
+Each scenario is one sampled set of spread times for the arcs. The arrival
+times of all scenarios are computed in one batched pass: the scenarios are
+stacked into a block-diagonal graph and solved with a single multi-source
+Dijkstra from scipy. The same routine is run in worker processes by the
+sample-average LBBD in model_SAA.py.
+
+"""
+
+# Packages
+from scipy.sparse.csgraph import dijkstra
+from scipy.sparse import csr_matrix
+import multiprocessing as mp
+import numpy as np
+
+
+# ------------------------ #
+# --- Sample scenarios --- #
+# ------------------------ #
+# Mean-preserving lognormal noise on every arc weight. Returns an
+# array with one row per scenario, columns in the order of Arcs.
+def SampleScenarios(Arcs, Scenarios, Sigma, Seed):
+    Random = np.random.RandomState(Seed)
+    Base = np.array([Arcs[a] for a in Arcs], dtype=float)
+    return Base * Random.lognormal(-Sigma ** 2 / 2, Sigma, (Scenarios, len(Base)))
+
+
+# --------------------------------- #
+# --- Index the graph for scipy --- #
+# --------------------------------- #
+def EnsembleGraph(Nodes, Arcs, Ignitions):
+    Index = {n: k for (k, n) in enumerate(Nodes)}
+    Tail = np.array([Index[a[0]] for a in Arcs], dtype=np.int64)
+    Head = np.array([Index[a[1]] for a in Arcs], dtype=np.int64)
+
+    # Arcs sorted by tail give the CSR layout of one scenario
+    Order = np.argsort(Tail, kind="stable")
+    Indptr = np.concatenate([[0], np.cumsum(np.bincount(Tail, minlength=len(Nodes)))])
+
+    return {"Nodes": list(Nodes), "Index": Index,
+            "Tail": Tail[Order], "Head": Head[Order], "Order": Order,
+            "Indptr": Indptr, "Sources": np.array([Index[n] for n in Ignitions])}
+
+
+# --------------------------------------- #
+# --- Arrival times of many scenarios --- #
+# --------------------------------------- #
+# Weights has one row per scenario and Placed flags the nodes with a
+# resource. Returns the arrival times and predecessors (-1 if none),
+# both with one row per scenario and one column per node.
+def ScenarioArrivals(Graph, Weights, Placed, Delay):
+    S = len(Weights)
+    N = len(Graph["Nodes"])
+    A = len(Graph["Tail"])
+    Offsets = np.arange(S) * N
+
+    # Block-diagonal graph with one copy per scenario
+    Data = Weights[:, Graph["Order"]] + Delay * Placed[Graph["Tail"]]
+    Indices = (Graph["Head"][None, :] + Offsets[:, None]).ravel()
+    Indptr = np.concatenate([[0], (
+        Graph["Indptr"][1:][None, :] + (np.arange(S) * A)[:, None]).ravel()])
+    Block = csr_matrix((Data.ravel(), Indices, Indptr), shape=(S * N, S * N))
+
+    # Every scenario starts from its own copy of the ignitions
+    Sources = (Graph["Sources"][None, :] + Offsets[:, None]).ravel()
+    Dist, Pred, _ = dijkstra(Block, directed=True, indices=Sources,
+                             min_only=True, return_predecessors=True)
+
+    Dist = Dist.reshape(S, N)
+    Pred = Pred.reshape(S, N)
+    Pred = np.where(Pred >= 0, Pred - Offsets[:, None], -1)
+    return Dist, Pred
+
+
+# ---------------------------- #
+# --- Evaluate a placement --- #
+# ---------------------------- #
+# Expected and worst-case number of nodes burned before the target,
+# evaluated in chunks of scenarios to bound the memory use
+def EvaluateEnsemble(Graph, Weights, PlacedRes, Delay, ArrivalTimeTarget, ChunkSize=64):
+    Placed = np.zeros(len(Graph["Nodes"]), dtype=bool)
+    Placed[[Graph["Index"][n] for n in PlacedRes]] = True
+
+    Burned = []
+    for Start in range(0, len(Weights), ChunkSize):
+        Dist, _ = ScenarioArrivals(Graph, Weights[Start:Start + ChunkSize], Placed, Delay)
+        Burned.append((Dist < ArrivalTimeTarget).sum(axis=1))
+    Burned = np.concatenate(Burned)
+
+    return Burned.mean(), Burned.max(), Burned
+
+
+# ------------------------------------- #
+# --- Parallel scenario subproblems --- #
+# ------------------------------------- #
+# Worker processes keep the graph and the scenario weights
+# so each call only sends the placement
+Worker = {}
+
+
+def InitWorker(Graph, Weights, Delay):
+    Worker["Graph"] = Graph
+    Worker["Weights"] = Weights
+    Worker["Delay"] = Delay
+
+
+def WorkerArrivals(Scenarios, Placed):
+    return ScenarioArrivals(
+        Worker["Graph"], Worker["Weights"][Scenarios], Placed, Worker["Delay"])
+
+
+def ArrivalPool(Graph, Weights, Delay, Workers):
+    if Workers <= 1:
+        return None
+    return mp.Pool(Workers, initializer=InitWorker, initargs=(Graph, Weights, Delay))
+
+
+# Arrival times and predecessors of all scenarios,
+# split over the pool if there is one
+def EnsembleArrivals(Pool, Workers, Graph, Weights, Placed, Delay):
+    if Pool is None:
+        return ScenarioArrivals(Graph, Weights, Placed, Delay)
+
+    Chunks = [c for c in np.array_split(np.arange(len(Weights)), Workers) if len(c)]
+    Results = Pool.starmap(WorkerArrivals, [(c, Placed) for c in Chunks])
+    return np.vstack([r[0] for r in Results]), np.vstack([r[1] for r in Results])
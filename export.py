@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Export of solutions as grid arrays
+
+Writes the arrival times, burned flags, predecessors and placement of a
+solution as .npy files in grid layout, cell (i, j) at row i and column j,
+so they can be memory-mapped without loading Python objects:
+
+    arrival.npy    float64, inf if the fire never arrives, nan off the grid
+    burned.npy     bool, burned before the target time
+    pred.npy       int64, flat index i * Cols + j of the predecessor, -1 if none
+    placement.npy  int64, deployment time of the resource, -1 if none
+
+"""
+
+# Packages
+from pathlib import Path
+import numpy as np
+
+
+Files = ["arrival", "burned", "pred", "placement"]
+
+
+# ----------------------- #
+# --- Write the grids --- #
+# ----------------------- #
+def ExportResults(Folder, Nodes, ArrivalTime, Pred, Burned, Placement):
+    Folder = Path(Folder)
+    Folder.mkdir(parents=True, exist_ok=True)
+
+    I = np.array([n[0] for n in Nodes], dtype=np.int64)
+    J = np.array([n[1] for n in Nodes], dtype=np.int64)
+    Shape = (int(I.max()) + 1, int(J.max()) + 1)
+
+    def Grid(Name, dtype, Fill):
+        Array = np.lib.format.open_memmap(
+            Folder / f"{Name}.npy", mode="w+", dtype=dtype, shape=Shape)
+        Array[:] = Fill
+        return Array
+
+    Arrival = Grid("arrival", np.float64, np.nan)
+    Arrival[I, J] = [ArrivalTime[n] for n in Nodes]
+
+    Burn = Grid("burned", np.bool_, False)
+    Burn[I, J] = [bool(Burned[n]) for n in Nodes]
+
+    Predecessor = Grid("pred", np.int64, -1)
+    Predecessor[I, J] = [-1 if Pred[n] is None else Pred[n][0] * Shape[1] + Pred[n][1]
+                         for n in Nodes]
+
+    Deployment = Grid("placement", np.int64, -1)
+    for (n, t) in Placement:
+        Deployment[n] = t
+
+    for Array in [Arrival, Burn, Predecessor, Deployment]:
+        Array.flush()
+
+
+# Results of a solved FireMIP or FireLBBD model
+def ExportModel(Folder, Model, Placement):
+    ExportResults(Folder, list(Model._Burned), Model._ArrivalTime, Model._Pred,
+                  Model._Burned, Placement)
+
+
+# ---------------------- #
+# --- Read the grids --- #
+# ---------------------- #
+# Memory-mapped by default, mmap_mode=None loads the arrays
+def LoadResults(Folder, mmap_mode="r"):
+    return {Name: np.load(Path(Folder) / f"{Name}.npy", mmap_mode=mmap_mode)
+            for Name in Files}
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Seeded generator of synthetic grid landscapes
+
+Instances are written in the same JSON schema as the shipped instances, so
+they can be read with Load from the main scripts. Arc weights are vectorised
+with numpy and the JSON file is streamed in chunks, so grids with millions
+of cells can be written without building the Python dictionaries.
+
+    python generator.py L1000.json --rows 1000 --cols 1000 --seed 0
+
+"""
+
+# Packages
+from ast import literal_eval
+import numpy as np
+import argparse
+import json
+
+
+# Neighbourhood stencils as (di, dj) offsets
+Stencils = {
+    4: [(-1, 0), (0, -1), (0, 1), (1, 0)],
+    8: [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)],
+    16: [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1),
+         (-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]}
+
+
+# Parameters of each spread-rate distribution when none are given
+RateDefaults = {
+    "constant": (1,),
+    "uniform": (0.5, 1.5),
+    "lognormal": (0, 0.5),
+    "exponential": (1,)}
+
+
+# ----------------------------- #
+# --- Spread rates per cell --- #
+# ----------------------------- #
+def SpreadRates(Random, Rows, Cols, Rate, RateParams=None):
+    if RateParams is None:
+        if Rate not in RateDefaults:
+            raise ValueError(f"Unknown spread-rate distribution {Rate}")
+        RateParams = RateDefaults[Rate]
+    if Rate == "constant":
+        (Value,) = RateParams
+        return np.full((Rows, Cols), float(Value))
+    if Rate == "uniform":
+        (Low, High) = RateParams
+        return Random.uniform(Low, High, (Rows, Cols))
+    if Rate == "lognormal":
+        (Mean, Sigma) = RateParams
+        return Random.lognormal(Mean, Sigma, (Rows, Cols))
+    if Rate == "exponential":
+        (Scale,) = RateParams
+        return Random.exponential(Scale, (Rows, Cols))
+    raise ValueError(f"Unknown spread-rate distribution {Rate}")
+
+
+# --------------------------- #
+# --- Arcs as flat arrays --- #
+# --------------------------- #
+# Returns the tail and head coordinates and the spread time of every arc.
+# The spread time of an arc is its length divided by the spread rate,
+# averaged over the half cells of the tail and the head.
+def LandscapeArcs(Rows, Cols, Stencil, Rates, Decimals):
+    Tails, Heads, Weights = [], [], []
+    I, J = np.indices((Rows, Cols))
+    for (di, dj) in Stencils[Stencil]:
+        Rs = slice(max(0, -di), Rows - max(0, di))
+        Cs = slice(max(0, -dj), Cols - max(0, dj))
+        Rd = slice(max(0, di), Rows - max(0, -di))
+        Cd = slice(max(0, dj), Cols - max(0, -dj))
+        Length = (di * di + dj * dj) ** 0.5
+        Tails.append(np.stack([I[Rs, Cs].ravel(), J[Rs, Cs].ravel()], axis=1))
+        Heads.append(np.stack([I[Rd, Cd].ravel(), J[Rd, Cd].ravel()], axis=1))
+        Weights.append(np.round(Length * 0.5 * (
+            1 / Rates[Rs, Cs] + 1 / Rates[Rd, Cd]).ravel(), Decimals))
+
+    return np.concatenate(Tails), np.concatenate(Heads), np.concatenate(Weights)
+
+
+# ------------------------------- #
+# --- Ignitions and resources --- #
+# ------------------------------- #
+def Scenario(Random, Rows, Cols, Ignitions, Delay, ArrivalTimeTarget, ResAtTime):
+
+    # Ignitions are distinct random cells
+    Cells = Random.choice(Rows * Cols, Ignitions, replace=False)
+    Ignitions = [(int(c // Cols), int(c % Cols)) for c in Cells]
+
+    # By default the target lets the fire cover about
+    # a quarter of the grid side at unit spread rate
+    if ArrivalTimeTarget is None:
+        ArrivalTimeTarget = max(Rows, Cols) // 4
+    if Delay is None:
+        Delay = max(1, ArrivalTimeTarget // 10)
+
+    # By default two deployment periods at a third and two thirds of the
+    # target, they must be distinct, at least 1 and before the target
+    if ResAtTime is None:
+        Count = max(1, (Rows + Cols) // 20)
+        Periods = [int(ArrivalTimeTarget // 3), int(2 * ArrivalTimeTarget // 3)]
+        if not 1 <= Periods[0] < Periods[1] < ArrivalTimeTarget:
+            raise ValueError(
+                f"Arrival time target {ArrivalTimeTarget} of the {Rows}x{Cols} grid "
+                f"leaves no two deployment periods before it, give ResAtTime "
+                f"or a target of at least 3")
+        ResAtTime = {t: Count for t in Periods}
+
+    return Ignitions, Delay, ArrivalTimeTarget, ResAtTime
+
+
+# -------------------------------------- #
+# --- Generate an instance in memory --- #
+# -------------------------------------- #
+def GenerateLandscape(Rows, Cols, Stencil=8, Rate="lognormal", RateParams=None,
+                      Ignitions=1, Delay=None, ArrivalTimeTarget=None,
+                      ResAtTime=None, Seed=0, Decimals=3):
+    Random = np.random.RandomState(Seed)
+    Rates = SpreadRates(Random, Rows, Cols, Rate, RateParams)
+    Tails, Heads, Weights = LandscapeArcs(Rows, Cols, Stencil, Rates, Decimals)
+    Ignitions, Delay, ArrivalTimeTarget, ResAtTime = Scenario(
+        Random, Rows, Cols, Ignitions, Delay, ArrivalTimeTarget, ResAtTime)
+
+    N = [(i, j) for i in range(Rows) for j in range(Cols)]
+    A = {((a, b), (c, d)): w for ((a, b), (c, d), w) in zip(
+        Tails.tolist(), Heads.tolist(), Weights.tolist())}
+
+    return N, A, Ignitions, Delay, ArrivalTimeTarget, ResAtTime
+
+
+# ----------------------------------------- #
+# --- Stream an instance to a JSON file --- #
+# ----------------------------------------- #
+def WriteLandscape(File, Rows, Cols, Stencil=8, Rate="lognormal", RateParams=None,
+                   Ignitions=1, Delay=None, ArrivalTimeTarget=None,
+                   ResAtTime=None, Seed=0, Decimals=3, ChunkSize=100000):
+    Random = np.random.RandomState(Seed)
+    Rates = SpreadRates(Random, Rows, Cols, Rate, RateParams)
+    Tails, Heads, Weights = LandscapeArcs(Rows, Cols, Stencil, Rates, Decimals)
+    Ignitions, Delay, ArrivalTimeTarget, ResAtTime = Scenario(
+        Random, Rows, Cols, Ignitions, Delay, ArrivalTimeTarget, ResAtTime)
+
+    with open(File, 'w') as file:
+        file.write('{"Delay": %s, "ArrivalTimeTarget": %s, ' % (
+            json.dumps(Delay), json.dumps(ArrivalTimeTarget)))
+        file.write('"ResAtTime": %s, ' % json.dumps(
+            {str(t): ResAtTime[t] for t in ResAtTime}))
+        file.write('"Ignitions": %s, ' % json.dumps([list(n) for n in Ignitions]))
+
+        # Nodes row by row
+        file.write('"Nodes": [')
+        for i in range(Rows):
+            file.write((", " if i > 0 else "") + ", ".join(
+                f"[{i}, {j}]" for j in range(Cols)))
+        file.write('], ')
+
+        # Arcs in chunks, keys are the tuple strings read by literal_eval
+        file.write('"Arcs": {')
+        for Start in range(0, len(Weights), ChunkSize):
+            End = min(Start + ChunkSize, len(Weights))
+            file.write((", " if Start > 0 else "") + ", ".join(
+                f'"(({a}, {b}), ({c}, {d}))": {w!r}' for ((a, b), (c, d), w) in zip(
+                    Tails[Start:End].tolist(), Heads[Start:End].tolist(),
+                    Weights[Start:End].tolist())))
+        file.write('}}')
+
+
+if __name__ == "__main__":
+    Parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    Parser.add_argument("file", help="output JSON file")
+    Parser.add_argument("--rows", type=int, required=True)
+    Parser.add_argument("--cols", type=int, required=True)
+    Parser.add_argument("--stencil", type=int, default=8, choices=sorted(Stencils))
+    Parser.add_argument("--rate", default="lognormal",
+                        choices=["constant", "uniform", "lognormal", "exponential"],
+                        help="spread-rate distribution (cells per time unit)")
+    Parser.add_argument("--rate-params", type=float, nargs="+", default=None,
+                        help="distribution parameters, e.g. mean and sigma for lognormal, "
+                             "defaults to " + ", ".join(f"{Rate} {' '.join(map(str, Params))}"
+                                                        for Rate, Params in RateDefaults.items()))
+    Parser.add_argument("--ignitions", type=int, default=1)
+    Parser.add_argument("--delay", type=float, default=None)
+    Parser.add_argument("--target", type=float, default=None,
+                        help="arrival time target")
+    Parser.add_argument("--res-at-time", type=literal_eval, default=None,
+                        help='resource schedule, e.g. "{10: 5, 20: 5}"')
+    Parser.add_argument("--seed", type=int, default=0)
+    Args = Parser.parse_args()
+
+    WriteLandscape(Args.file, Args.rows, Args.cols, Args.stencil, Args.rate,
+                   Args.rate_params, Args.ignitions, Args.delay, Args.target,
+                   Args.res_at_time, Args.seed)
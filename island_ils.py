@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Island-model parallel ILS
+
+Several ILS chains run in separate processes, each with its own seed and
+its own perturbation probabilities. The islands form a ring: every
+MigrationInterval iterations an island sends its best placement to the next
+island and takes the best placement it has received if that one is better.
+The best solution over all islands is returned.
+
+"""
+
+# Packages
+from IteratedLocalSearch import FireILS
+import multiprocessing as mp
+import numpy as np
+import queue
+
+
+# --------------------- #
+# --- One ILS chain --- #
+# --------------------- #
+def Island(k, Instance, Parameters, Seed, Inbox, Outbox, MigrationInterval, Results):
+    Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget = Instance
+    np.random.seed(Seed)
+
+    # Migrants are only hints, so unsent ones may be dropped at exit
+    Outbox.cancel_join_thread()
+    Iterations = [0]
+
+    def Migrate(ZSol, ObjVal):
+        Iterations[0] += 1
+        if Iterations[0] % MigrationInterval != 0:
+            return None
+
+        # Send the best placement to the next island
+        Placement = [(n, t) for (n, t) in ZSol if ZSol[n, t] > .5]
+        Outbox.put((ObjVal, Placement))
+
+        # Best placement received since the last migration
+        Best = None
+        while True:
+            try:
+                Received = Inbox.get_nowait()
+            except queue.Empty:
+                break
+            if Best is None or Received[0] < Best[0]:
+                Best = Received
+        if Best is None or Best[0] >= ObjVal:
+            return None
+
+        Placement = set(Best[1])
+        return {(n, t): int((n, t) in Placement) for n in Nodes
+                for t in ResAtTime}, Best[0]
+
+    # A failure is reported as an objective of None and the error
+    try:
+        ZSol, ObjVal = FireILS(
+            Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
+            *Parameters, Migrate=Migrate)
+    except Exception as Error:
+        Results.put((k, None, f"{type(Error).__name__}: {Error}"))
+        return
+    Results.put((k, ObjVal, [(n, t) for (n, t) in ZSol if ZSol[n, t] > .5]))
+
+
+# ------------------ #
+# --- Island ILS --- #
+# ------------------ #
+# Island k uses the seed Seed + k and p1 and p2 scaled by a factor
+# spread evenly over [1 - Spread, 1 + Spread], 1 for a single island.
+# TimeLimit applies to each island. An island that fails stops the others
+# and raises a RuntimeError. Returns the best placement, its objective and the
+# objective of each island.
+def IslandILS(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
+              MultiStarts, p1, p2, MaxNeighbours, MaxModifications, MaxFailures,
+              MaxNoImprovements, MaxCandidates, Islands=4, MigrationInterval=10,
+              Seed=0, Spread=0.5, TimeLimit=None):
+    Context = mp.get_context("spawn")
+    Instance = (Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget)
+
+    # One inbox per island, island k sends to island k + 1
+    Inboxes = [Context.Queue() for _ in range(Islands)]
+    Results = Context.Queue()
+
+    Factors = np.linspace(1 - Spread, 1 + Spread, Islands) if Islands > 1 else [1]
+    Processes = []
+    for k, Factor in enumerate(Factors):
+        Parameters = (MultiStarts, p1 * Factor, p2 * Factor, MaxNeighbours,
+                      MaxModifications, MaxFailures, MaxNoImprovements,
+                      MaxCandidates, None, None, None, None, TimeLimit)
+        Processes.append(Context.Process(target=Island, args=(
+            k, Instance, Parameters, Seed + k, Inboxes[k],
+            Inboxes[(k + 1) % Islands], MigrationInterval, Results)))
+    for Process in Processes:
+        Process.start()
+
+    def Stop(Message):
+        for Process in Processes:
+            Process.terminate()
+        raise RuntimeError(Message)
+
+    # Collect the results before joining so no island blocks on the queue.
+    # Islands report their errors, an island that crashed without a report
+    # is found by its exit code, once the queue is drained.
+    Objectives = [None] * Islands
+    Best = None
+    for _ in range(Islands):
+        while True:
+            try:
+                k, ObjVal, Placement = Results.get(timeout=1)
+                break
+            except queue.Empty:
+                Crashed = [k for k, Process in enumerate(Processes)
+                           if Objectives[k] is None and Process.exitcode not in [None, 0]]
+                if len(Crashed) == 0 and any(Process.is_alive() for Process in Processes):
+                    continue
+                try:
+                    k, ObjVal, Placement = Results.get_nowait()
+                    break
+                except queue.Empty:
+                    Stop(", ".join(f"island {k} exited with code {Processes[k].exitcode}"
+                                   for k in Crashed) or "islands exited without results")
+        if ObjVal is None:
+            Stop(f"island {k} failed: {Placement}")
+        Objectives[k] = ObjVal
+        if Best is None or ObjVal < Best[0]:
+            Best = (ObjVal, Placement)
+    for Process in Processes:
+        Process.join()
+
+    return Best[1], Best[0], Objectives
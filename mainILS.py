@@ -7,6 +7,7 @@ Solve instance(s) using the ILS
 # Packages
 from parameters import ParametersSmall, ParametersLarge
 from IteratedLocalSearch import FireILS
+from convergence_log import ConvergenceLog
 from ast import literal_eval
 from pathlib import Path
 import json
@@ -41,6 +42,9 @@ Instance = Path(__file__).parent / Inst
 # Solution location
 SolutionFile = Path(__file__).parent / f"solutions/{Folder}/{Size}/Sol_{l}{n1}.csv"
 
+# Convergence log location
+LogFile = Path(__file__).parent / f"logs/{Folder}/{Size}/Log_{l}{n1}_{n2}.jsonl"
+
 
 # Add header
 if not Path.exists(SolutionFile):
@@ -65,14 +69,18 @@ MaxModifications = 5
 MaxFailures = 100
 MaxNoImprovements = 50
 
+# Best objective over time
+Log = ConvergenceLog(LogFile)
+
 
 # Solve
 StartTime = time.time()
 ZSol, ObjVal = FireILS(
     N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
     MultiStarts, p1, p2, MaxNeighbours, MaxModifications, 
-    MaxFailures, MaxNoImprovements, MaxCandidates)
+    MaxFailures, MaxNoImprovements, MaxCandidates, Log=Log)
 Runtime = time.time() - StartTime
+Log.Close()
 
 
 # Store ILS solution info
@@ -6,7 +6,10 @@ Solve instance(s) using LBBD
 
 # Packages
 from parameters import ParametersSmall, ParametersLarge
-from model_LBBD import FireLBBD
+from model_LBBD import BuildLBBD, SolveLBBD
+from cut_store import InstanceHash, LoadFirePaths, SaveFirePaths
+from convergence_log import ConvergenceLog
+from export import ExportModel
 from ast import literal_eval
 from pathlib import Path
 import json
@@ -40,6 +43,12 @@ Instance = Path(__file__).parent / Inst
 # Solution location
 SolutionFile = Path(__file__).parent / f"solutions/{Folder}/{Size}/Sol_{l}{n1}.csv"
 
+# Convergence log location
+LogFile = Path(__file__).parent / f"logs/{Folder}/{Size}/Log_{l}{n1}_{n2}.jsonl"
+
+# Solution grid location
+ResultFolder = Path(__file__).parent / f"results/{Folder}/{Size}/{l}{n1}_{n2}"
+
 
 # Add header
 if not Path.exists(SolutionFile):
@@ -60,13 +69,21 @@ TimeLimit = 7200
 # Seed
 GurobiSeed = 0
 
-# Solve with greedy LBBD
-Greedy, ZGreedy = FireLBBD(
-    N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, GurobiSeed, None, True)
+# Incumbent and bound over time
+Log = ConvergenceLog(LogFile)
 
-# Solve with exact LBBD
-Exact, _ = FireLBBD(
-    N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, GurobiSeed, ZGreedy, False)
+# Fire paths of earlier runs on this instance
+CutStore = Path(__file__).parent / "cuts"
+Hash = InstanceHash(N, A, Ignitions, Delay, ArrivalTimeTarget)
+FirePaths = LoadFirePaths(CutStore, Hash)
+
+# Build the LBBD master once for both solves
+Model = BuildLBBD(
+    N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, GurobiSeed,
+    FirePaths=FirePaths, Log=Log)
+
+# Solve with greedy LBBD
+Greedy, ZGreedy = SolveLBBD(Model, None, True)
 
 
 # Store greedy solution info
@@ -83,6 +100,17 @@ with open(SolutionFile, 'a', newline='') as file:
     writer.writerow(Row)
 
 
+# Solve with exact LBBD on the same model, keeping the greedy cuts
+Exact, ZExact = SolveLBBD(Model, ZGreedy, False)
+
+# Store the fire paths for later runs
+SaveFirePaths(CutStore, Hash, Exact._FirePaths)
+Log.Close()
+
+# Store the solution grids
+ExportModel(ResultFolder / "LBBD", Exact, ZExact)
+
+
 # Store exact solution info
 Row = [Folder, Size, n1, n2, len(N), len(A), "Exact LBBD"]
 Row.append(round(Exact.objVal))
@@ -94,4 +122,3 @@ Row.append(round(Exact._FeasibilityCuts))
 with open(SolutionFile, 'a', newline='') as file:
     writer = csv.writer(file)
     writer.writerow(Row)
-
@@ -7,6 +7,8 @@ Solve instance(s) using a MIP
 # Packages
 from parameters import ParametersSmall, ParametersLarge
 from model_MIP import FireMIP
+from convergence_log import ConvergenceLog
+from export import ExportModel
 from ast import literal_eval
 from pathlib import Path
 import json
@@ -40,6 +42,12 @@ Instance = Path(__file__).parent / Inst
 # Solution location
 SolutionFile = Path(__file__).parent / f"solutions/{Folder}/{Size}/Sol_{l}{n1}.csv"
 
+# Convergence log location
+LogFile = Path(__file__).parent / f"logs/{Folder}/{Size}/Log_{l}{n1}_{n2}.jsonl"
+
+# Solution grid location
+ResultFolder = Path(__file__).parent / f"results/{Folder}/{Size}/{l}{n1}_{n2}"
+
 
 # Add header
 if not Path.exists(SolutionFile):
@@ -59,8 +67,16 @@ TimeLimit = 7200
 # Seed
 GurobiSeed = 0
 
+# Incumbent and bound over time
+Log = ConvergenceLog(LogFile)
+
 # Solve with greedy LBBD
-ModelMIP = FireMIP(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, GurobiSeed)
+ModelMIP = FireMIP(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, GurobiSeed,
+                   Log=Log)
+Log.Close()
+
+# Store the solution grids
+ExportModel(ResultFolder / "MIP", ModelMIP, ModelMIP._Solution)
 
 
 # Store greedy solution info
@@ -5,22 +5,95 @@ Main LBBD model
 """
 
 # Packages
-from shortest_paths import ShortestPaths
+from shortest_paths import ShortestPaths, IgnitionTimes
+from IteratedLocalSearch import ImproveByMoves
 import gurobipy as gp
+import numpy as np
+import bisect
 import math
+import time
+
+
+# Resources needed on a fire path to delay it by Gap. Arrival times carry
+# rounding errors, more so with ignition times below 0, so a gap within EPS
+# of a multiple of Delay needs no extra resource, but a fire path before
+# the target always needs one.
+def Interdictions(Gap, Delay, EPS=0.0001):
+    return max(1, math.ceil((Gap - EPS) / Delay))
+
+
+# --------------------- #
+# --- Fire path cut --- #
+# --------------------- #
+# Cut from any fire path that starts at an ignition and reaches its last node
+# before the target time. Returns the number of interdictions required and
+# the (node, time) pairs whose resource delays the fire on the path in time,
+# or None if the path is not a fire path of the instance.
+def FirePathCut(Path, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget):
+    if Path[0] not in Ignitions:
+        return None
+
+    # Arrival times along the path
+    Arrival = [IgnitionTimes(Ignitions)[Path[0]]]
+    for a in zip(Path, Path[1:]):
+        if a not in Arcs:
+            return None
+        Arrival.append(Arrival[-1] + Arcs[a])
+    if Arrival[-1] >= ArrivalTimeTarget:
+        return None
+
+    # Minimum interdictions needed
+    Gap = ArrivalTimeTarget - Arrival[-1]
+    Required = Interdictions(Gap, Delay)
+
+    return Required, [(nn, t) for (nn, a) in zip(Path[1:-1], Arrival[1:-1])
+                      for t in ResAtTime if t <= a + (Required - 1) * Delay]
 
 
 # ------------------------ #
 # --- LBBD Formulation --- #
 # ------------------------ #
+# Committed is a set of nodes that already hold a resource, FirePaths are fire
+# paths (ignition first) from earlier runs that are turned into initial cuts,
+# with the Lazy attribute FirePathsLazy (0 adds them as ordinary constraints),
+# InArcs and OutArcs can be passed in to reuse them and Env is an optional
+# Gurobi environment. RootPaths > 0 adds initial cuts on up to that many
+# more fire paths per node, at most MaxRootCuts in total. Polish > 0 improves
+# each incumbent with up to that many rounds of resource moves (see
+# ImproveByMoves) and hands better placements to Gurobi at the next node.
+# Log is an optional ConvergenceLog for the incumbent, bound, cuts and
+# shortest path problems over time. Ignitions are a list of nodes or a dict
+# of ignition times (see IgnitionTimes). SplitTimeLimit is passed to
+# SolveLBBD.
 def FireLBBD(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, 
-             TimeLimit, GurobiSeed, ZStart, Heuristic):
+             TimeLimit, GurobiSeed, ZStart, Heuristic, Committed=None,
+             FirePaths=None, InArcs=None, OutArcs=None, FirePathsLazy=0, Env=None,
+             RootPaths=0, MaxRootCuts=None, Polish=0, PolishNeighbours=20, Log=None,
+             SplitTimeLimit=False):
+    Model = BuildLBBD(
+        Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit,
+        GurobiSeed, Committed, FirePaths, InArcs, OutArcs, FirePathsLazy, Env,
+        RootPaths, MaxRootCuts, Polish, PolishNeighbours, Log)
+    return SolveLBBD(Model, ZStart, Heuristic, SplitTimeLimit)
+
+
+# ----------------------------- #
+# --- Build the LBBD master --- #
+# ----------------------------- #
+# The model can be solved several times with SolveLBBD, e.g. greedily and
+# then exactly. The fire paths of the optimality cuts of one solve are added
+# as constraints before the next one.
+def BuildLBBD(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, 
+              TimeLimit, GurobiSeed, Committed=None, FirePaths=None,
+              InArcs=None, OutArcs=None, FirePathsLazy=0, Env=None,
+              RootPaths=0, MaxRootCuts=None, Polish=0, PolishNeighbours=20,
+              Log=None):
 
     # Epsilon
     EPS = 0.0001
     
     # Gurobi model
-    Model = gp.Model()
+    Model = gp.Model(env=Env)
     Model.setParam("Threads", 1)
     # Model.setParam("OutputFlag", 0)
     Model.setParam("LazyConstraints", 1)
@@ -29,6 +102,9 @@ def FireLBBD(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
     Model._ShortestPathProblemsSolved = 0
     Model._OptimalityCuts = 0
     Model._FeasibilityCuts = 0
+    Model._Callbacks = 0
+    Model._CallbackTime = 0
+    Model._PolishedSolutions = 0
     
     
     # Seed if one is given
@@ -41,12 +117,29 @@ def FireLBBD(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
         Model.setParam("TimeLimit", TimeLimit)
     
     
+    # Instance data for later runs
+    Model._Nodes = Nodes
+    Model._Arcs = Arcs
+    Model._Delay = Delay
+    Model._ArrivalTimeTarget = ArrivalTimeTarget
+    
+    
+    # Resources already on the ground delay the fire on their outarcs
+    if Committed is None:
+        Committed = set()
+    if len(Committed) > 0:
+        Arcs = {a: Arcs[a] + Delay * int(a[0] in Committed) for a in Arcs}
+    
+    
     # Generate in- and outarcs
-    InArcs = {n: [] for n in Nodes}
-    OutArcs = {n: [] for n in Nodes}
-    for a in Arcs:
-        OutArcs[a[0]].append((a[0], a[1]))
-        InArcs[a[1]].append((a[0], a[1]))
+    if InArcs is None or OutArcs is None:
+        InArcs = {n: [] for n in Nodes}
+        OutArcs = {n: [] for n in Nodes}
+        for a in Arcs:
+            OutArcs[a[0]].append((a[0], a[1]))
+            InArcs[a[1]].append((a[0], a[1]))
+    Model._InArcs = InArcs
+    Model._OutArcs = OutArcs
     
 
     # Decision variables
@@ -70,9 +163,9 @@ def FireLBBD(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
     ResPerNode = {n: Model.addConstr(gp.quicksum(
         IsResource[n, t] for t in ResAtTime) <= 1) for n in Nodes}
 
-    # No resources at ignition node
+    # No resources at ignition or committed nodes
     for (n, t) in IsResource:
-        if n in Ignitions:
+        if n in Ignitions or n in Committed:
             IsResource[n, t].ub = 0
 
     #  The objective is the number of burned nodes
@@ -93,7 +186,7 @@ def FireLBBD(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
     
             # Minimum interdictions needed
             Gap = ArrivalTimeTarget - ArrNone[n]
-            Required = math.ceil(Gap / Delay)
+            Required = Interdictions(Gap, Delay)
                 
             # Fire path expression
             FirePathExpr = gp.quicksum(
@@ -103,71 +196,262 @@ def FireLBBD(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
             # Add initial cut
             Model.addConstr(DoesBurn[n] >= 1 - FirePathExpr)  
     
+    
+    # Cuts on more fire paths per node. The shortest fire path to an
+    # inneighbour, then the arc into the node, for the inneighbours
+    # other than the predecessor that the fire reaches in time.
+    Model._RootCuts = 0
+    if RootPaths > 0:
+        
+        # Fire path to a node, ignition first
+        def FullPath(u):
+            if u in Ignitions:
+                return [u]
+            return [Pred[PathNone[u][0]]] + PathNone[u]
+        
+        for n in sorted(DoesBurn, key=lambda n: ArrNone[n]):
+            if n in Ignitions or ArrNone[n] >= ArrivalTimeTarget:
+                continue
+            if MaxRootCuts is not None and Model._RootCuts >= MaxRootCuts:
+                break
+            
+            # Nearest alternatives first
+            Alternatives = sorted(
+                (ArrNone[a[0]] + Arcs[a], a[0]) for a in InArcs[n]
+                if a[0] != Pred[n] and ArrNone[a[0]] + Arcs[a] < ArrivalTimeTarget)
+            Added = 0
+            for (_, u) in Alternatives:
+                if Added >= RootPaths or (
+                        MaxRootCuts is not None and Model._RootCuts >= MaxRootCuts):
+                    break
+                Path = FullPath(u)
+                if n in Path:
+                    continue
+                Cut = FirePathCut(Path + [n], Arcs, ResAtTime, Ignitions, Delay,
+                                  ArrivalTimeTarget)
+                if Cut is not None:
+                    Required, Terms = Cut
+                    Model.addConstr(DoesBurn[n] >= 1 - gp.quicksum(
+                        IsResource[_] for _ in Terms) / Required)
+                    Model._RootCuts += 1
+                    Added += 1
+    
+    
+    # Fire paths of the optimality cuts, kept for later runs, each once
+    Model._FirePaths = []
+    Model._PathSet = set()
+    
+    # Cuts on the given fire paths that are still valid
+    for Path in dict.fromkeys(tuple(_) for _ in FirePaths or []):
+        Cut = FirePathCut(Path, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget)
+        if Cut is not None:
+            Required, Terms = Cut
+            PathCut = Model.addConstr(DoesBurn[Path[-1]] >= 1 - gp.quicksum(
+                IsResource[_] for _ in Terms) / Required)
+            PathCut.Lazy = FirePathsLazy
+            Model._FirePaths.append(list(Path))
+            Model._PathSet.add(Path)
+    
+
+    # Variables in a fixed order, so the incumbent is read as lists
+    ResourceKeys = list(IsResource)
+    ResourceVars = [IsResource[_] for _ in ResourceKeys]
+    BurnVars = [DoesBurn[n] for n in Nodes]
+    
+    # Resource variables of each node sorted by time, so the ones
+    # that delay the fire in time are a prefix found by bisection
+    Times = sorted(ResAtTime)
+    TimeIndex = {t: k for (k, t) in enumerate(Times)}
+    NodeVars = {n: [IsResource[n, t] for t in Times] for n in Nodes}
+    
+    
+    # Fire path expression divided by Required, without
+    # the resources that are already in the incumbent
+    def FirePathExpr(Path, ArrivalTime, Required, Deployed):
+        Expr = gp.LinExpr()
+        for nn in Path:
+            k = bisect.bisect_right(Times, ArrivalTime[nn] + (Required - 1) * Delay)
+            Vars = NodeVars[nn][:k]
+            if nn in Deployed and TimeIndex[Deployed[nn]] < k:
+                Vars = Vars[:TimeIndex[Deployed[nn]]] + Vars[TimeIndex[Deployed[nn]] + 1:]
+            Expr.addTerms([1 / Required] * len(Vars), Vars)
+        return Expr
+    
 
     # Callback
     def Callback(model, where):
         if where == gp.GRB.Callback.MIPSOL:
+            CallbackStart = time.perf_counter()
         
             # Retrieve incumbent solution
-            IsResourceGet = model.cbGetSolution(IsResource)
-            DoesBurnGet = model.cbGetSolution(DoesBurn)
-            IsResourceV = {n: round(IsResourceGet[n]) for n in IsResourceGet}
-            DoesBurnV = {n: round(DoesBurnGet[n]) for n in DoesBurnGet}
+            IsResourceV = model.cbGetSolution(ResourceVars)
+            DoesBurnV = model.cbGetSolution(BurnVars)
 
-            
-            Incumbent = set(  # Set of nodes with a resource
-                n for n in Nodes for t in ResAtTime if IsResourceV[n, t] > .5)
+            # Deployment time of each node with a resource
+            Deployed = {}
+            for k in np.flatnonzero(np.array(IsResourceV) > .5):
+                n, t = ResourceKeys[k]
+                Deployed[n] = min(t, Deployed.get(n, t))
 
 
             # Solve shortest paths problem
             Model._ShortestPathProblemsSolved += 1
             ArrivalTime, FirePath, Pred = ShortestPaths(
-                Nodes, Arcs, InArcs, OutArcs, Incumbent, Ignitions, Delay)
+                Nodes, Arcs, InArcs, OutArcs, set(Deployed), Ignitions, Delay)
 
 
-            # Cut on nodes
-            for n in DoesBurn:
+            # FEASIBILITY on nodes with a resource
+            for n, tt in Deployed.items():
+                if ArrivalTime[n] < tt:
+                    
+                    # Minimum interdictions needed
+                    Gap = tt - ArrNone[n]
+                    Required = Interdictions(Gap, Delay)
 
-                # FEASIBILITY
-                if any(IsResourceV[n, t] > .5 for t in ResAtTime):
-                    tt = min(t for t in ResAtTime if IsResourceV[n, t] > .5)
+                    # Feasibility cut
+                    Model.cbLazy(1 - IsResource[n, tt] + FirePathExpr(
+                        FirePath[n][:-1], ArrivalTime, Required, Deployed) >= 1)
+                    Model._FeasibilityCuts += 1
 
-                    if ArrivalTime[n] < tt:
-                        
-                        # Minimum interdictions needed
-                        Gap = tt - ArrNone[n]
-                        Required = math.ceil(Gap / Delay)
-    
-                        # Fire path expression
-                        FirePathExpr = gp.quicksum(
-                            IsResource[nn, t] for nn in FirePath[n][:-1] 
-                            for t in ResAtTime if t <= ArrivalTime[nn] +
-                            (Required - 1) * Delay if IsResourceV[nn, t] < .5)
+
+            # Arrival times in the order of Nodes, as ShortestPaths builds them
+            Arrival = np.fromiter(ArrivalTime.values(), float, len(Nodes))
+            
+            
+            # OPTIMALITY on nodes that burn but are not counted
+            Uncounted = (np.array(DoesBurnV) < .5) & (Arrival < ArrivalTimeTarget - EPS)
+            for k in np.flatnonzero(Uncounted):
+                n = Nodes[k]
+                
+                # Find the minimum interdictions required
+                Gap = ArrivalTimeTarget - ArrivalTime[n]
+                Required = Interdictions(Gap, Delay)
+
+                # Optimality cut
+                Model.cbLazy(DoesBurn[n] >= 1 - FirePathExpr(
+                    FirePath[n][:-1], ArrivalTime, Required, Deployed))
+                Model._OptimalityCuts += 1
+                Path = [Pred[FirePath[n][0]]] + FirePath[n]
+                if tuple(Path) not in Model._PathSet:
+                    Model._PathSet.add(tuple(Path))
+                    Model._FirePaths.append(Path)
+
+
+            # Improve a new feasible incumbent that is better than the best
+            # objective by moving resources, once per placement
+            if Polish > 0 and all(ArrivalTime[n] >= tt for n, tt in Deployed.items()) \
+                    and np.count_nonzero(Arrival < ArrivalTimeTarget) < \
+                    model.cbGet(gp.GRB.Callback.MIPSOL_OBJBST) - EPS \
+                    and frozenset(Deployed.items()) not in Model._PolishedFrom:
+                Model._PolishedFrom.add(frozenset(Deployed.items()))
+                Placement, Obj, PolishedArrival = ImproveByMoves(
+                    Nodes, Arcs, InArcs, OutArcs, list(Deployed.items()), ResAtTime,
+                    Ignitions, Delay, ArrivalTimeTarget, PolishNeighbours, Polish,
+                    Committed)
+                
+                # Keep it for the next node if it beats the best objective
+                if Obj < model.cbGet(gp.GRB.Callback.MIPSOL_OBJBST) - EPS:
+                    Model._Polished = (set(Placement), PolishedArrival)
+
+            # Callback statistics
+            Model._Callbacks += 1
+            Model._CallbackTime += time.perf_counter() - CallbackStart
+        
+        
+        # Hand the improved placement to Gurobi
+        elif where == gp.GRB.Callback.MIPNODE and Model._Polished is not None:
+            if model.cbGet(gp.GRB.Callback.MIPNODE_STATUS) == gp.GRB.OPTIMAL:
+                Placement, PolishedArrival = Model._Polished
+                Model._Polished = None
+                model.cbSetSolution(ResourceVars, [
+                    float((n, t) in Placement) for (n, t) in ResourceKeys])
+                model.cbSetSolution(BurnVars, [
+                    float(PolishedArrival[n] < ArrivalTimeTarget) for n in Nodes])
+                model.cbUseSolution()
+                Model._PolishedSolutions += 1
+        
+        
+        # Convergence log
+        if Log is not None and where in [gp.GRB.Callback.MIP, gp.GRB.Callback.MIPSOL]:
+            Prefix = "MIP_" if where == gp.GRB.Callback.MIP else "MIPSOL_"
+            Log.Record(Model._LogMethod,
+                       model.cbGet(getattr(gp.GRB.Callback, Prefix + "OBJBST")),
+                       model.cbGet(getattr(gp.GRB.Callback, Prefix + "OBJBND")),
+                       cuts=Model._OptimalityCuts + Model._FeasibilityCuts,
+                       shortest_paths=Model._ShortestPathProblemsSolved)
     
-                        # Feasibility cut
-                        Model.cbLazy(1 - IsResource[n, tt] + FirePathExpr / Required  >= 1)
-                        Model._FeasibilityCuts += 1
+
+    # Keep what the solves need
+    Model._ResAtTime = ResAtTime
+    Model._Ignitions = Ignitions
+    Model._DelayedArcs = Arcs
+    Model._IsResource = IsResource
+    Model._DoesBurn = DoesBurn
+    Model._ResPerTime = ResPerTime
+    Model._Callback = Callback
     
+    # Fire paths that are already constraints of the model
+    Model._PathsInModel = len(Model._FirePaths)
+    Model._Fixed = []
     
-                # OPTIMALITY
-                if DoesBurnV[n] < 1 - EPS:
-                    if ArrivalTime[n] < ArrivalTimeTarget - EPS:
-                    
-                        # Find the minimum interdictions required
-                        Gap = ArrivalTimeTarget - ArrivalTime[n]
-                        Required = Gap // Delay + 1*int(Gap % Delay != 0)
-                        
-                        # Fire path expression
-                        FirePathExpr = gp.quicksum(
-                            IsResource[nn, t] for nn in FirePath[n][:-1]
-                            for t in ResAtTime if t <= ArrivalTime[nn] +
-                            (Required - 1) * Delay if IsResourceV[nn, t] < .5)
+    # Improved placement waiting for the next node
+    # and the placements it was improved from
+    Model._Polished = None
+    Model._PolishedFrom = set()
     
-                        # Optimality cut
-                        Model.cbLazy(DoesBurn[n] >= 1 - FirePathExpr / Required)
-                        Model._OptimalityCuts += 1
+    # Convergence log
+    Model._Log = Log
+    Model._LogMethod = "LBBD"
     
+    return Model
+
 
+# ----------------------------- #
+# --- Solve the LBBD master --- #
+# ----------------------------- #
+# Heuristic solves greedily, one deployment time after the other, each with
+# the time limit of the model. With SplitTimeLimit each gets an equal share
+# of the time that is left instead, so the limit holds for the whole solve.
+def SolveLBBD(Model, ZStart, Heuristic, SplitTimeLimit=False):
+    
+    # Model data
+    Nodes = Model._Nodes
+    Arcs = Model._DelayedArcs
+    InArcs = Model._InArcs
+    OutArcs = Model._OutArcs
+    ResAtTime = Model._ResAtTime
+    Ignitions = Model._Ignitions
+    Delay = Model._Delay
+    ArrivalTimeTarget = Model._ArrivalTimeTarget
+    IsResource = Model._IsResource
+    DoesBurn = Model._DoesBurn
+    ResPerTime = Model._ResPerTime
+    Callback = Model._Callback
+    
+    
+    # Free the fixings of an earlier greedy solve
+    Model.remove(Model._Fixed)
+    Model._Fixed = []
+    
+    # Cuts found by earlier solves become constraints
+    for Path in Model._FirePaths[Model._PathsInModel:]:
+        Cut = FirePathCut(Path, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget)
+        if Cut is not None:
+            Required, Terms = Cut
+            Model.addConstr(DoesBurn[Path[-1]] >= 1 - gp.quicksum(
+                IsResource[_] for _ in Terms) / Required)
+    Model._PathsInModel = len(Model._FirePaths)
+    
+    # Statistics of this solve
+    Model._OptimalityCuts = 0
+    Model._FeasibilityCuts = 0
+    Model._Callbacks = 0
+    Model._CallbackTime = 0
+    Model._PolishedSolutions = 0
+    Model._Polished = None
+    Model._LogMethod = "Greedy LBBD" if Heuristic else "LBBD"
+    
+    
     # Starting solution
     if ZStart is not None:
         for _ in IsResource:
@@ -190,12 +474,22 @@ def FireLBBD(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
 
     # Solve heuristically
     if Heuristic:
+        OutputFlag = Model.Params.OutputFlag
         Model.setParam("OutputFlag", 0)
+        Fixed = []
+        
+        # With SplitTimeLimit the time limit holds for all iterations
+        # together, each gets an equal share of the time that is left
+        TimeLimit = Model.Params.TimeLimit
+        StartTime = time.time()
 
         i = 0
         T = list(ResAtTime.keys())
         while i < len(ResAtTime):
             t = T[i]
+            if SplitTimeLimit:
+                Remaining = max(0, TimeLimit - (time.time() - StartTime))
+                Model.setParam("TimeLimit", Remaining / (len(ResAtTime) - i))
             
             # Fix right hand sides
             for n in Nodes:
@@ -209,7 +503,7 @@ def FireLBBD(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
             # Fix solution for t
             for n in Nodes:
                 if IsResource[n, t].x > 0.5:
-                    Model.addConstr(IsResource[n, t] == 1)
+                    Fixed.append(Model.addConstr(IsResource[n, t] == 1))
             
             # Reset right hand sides
             for n in Nodes:
@@ -219,6 +513,11 @@ def FireLBBD(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
             
             # Iterate
             i += 1
+        
+        # The fixings are freed by the next solve
+        Model._Fixed = Fixed
+        Model.setParam("OutputFlag", OutputFlag)
+        Model.setParam("TimeLimit", TimeLimit)
             
     else:
 
@@ -233,6 +532,13 @@ def FireLBBD(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
         Nodes, Arcs, InArcs, OutArcs, Model._Optimal, Ignitions, Delay)
     Model._Burned = {n: Model._ArrivalTime[n] < ArrivalTimeTarget for n in Nodes}
     Model._Theta = {n: DoesBurn[n].x for n in DoesBurn}
+    
+    # Final incumbent and bound as the last record of the log
+    if Model._Log is not None:
+        Model._Log.Record(Model._LogMethod, Model.objVal, Model.ObjBound,
+                          cuts=Model._OptimalityCuts + Model._FeasibilityCuts,
+                          shortest_paths=Model._ShortestPathProblemsSolved)
+        Model._Log.Flush()
 
 
     # Return model
@@ -6,13 +6,48 @@ Main MIP model
 
 # Packages
 from shortest_paths import ShortestPaths
+import scipy.sparse as sp
 import gurobipy as gp
+import numpy as np
+
+
+# ---------------------------- #
+# --- Convergence log hook --- #
+# ---------------------------- #
+# Callback that records the incumbent and the bound in a ConvergenceLog
+def LogCallback(Log, Method):
+    def Callback(model, where):
+        if where == gp.GRB.Callback.MIP:
+            Log.Record(Method, model.cbGet(gp.GRB.Callback.MIP_OBJBST),
+                       model.cbGet(gp.GRB.Callback.MIP_OBJBND))
+        elif where == gp.GRB.Callback.MIPSOL:
+            Log.Record(Method, min(model.cbGet(gp.GRB.Callback.MIPSOL_OBJ),
+                                   model.cbGet(gp.GRB.Callback.MIPSOL_OBJBST)),
+                       model.cbGet(gp.GRB.Callback.MIPSOL_OBJBND))
+    return Callback
+
+
+# Solve, with the final incumbent and bound as the last record of the log
+def LoggedOptimize(Model, Log, Method):
+    if Log is None:
+        Model.optimize()
+        return
+    Model.optimize(LogCallback(Log, Method))
+    Log.Record(Method, Model.objVal if Model.SolCount > 0 else None, Model.ObjBound)
+    Log.Flush()
 
 
 # ----------------------- #
 # --- MIP Formulation --- #
 # ----------------------- #
-def FireMIP(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, GurobiSeed):
+#
+# With DropUnusedY the indicator variables Y[n, t] are only added for the
+# target time, the others do not appear in the objective. Log is an optional
+# ConvergenceLog for the incumbent and bound over time. LazyCoupling > 0 is
+# the Lazy attribute (1 to 3) of the ResOnlyIfNotBurned, DoesBurn and
+# big-M families, so they are only added to the LP once they are violated.
+def FireMIP(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, GurobiSeed,
+            Env=None, DropUnusedY=False, Log=None, LazyCoupling=0):
 
     
     # Epsilon
@@ -31,6 +66,8 @@ def FireMIP(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, Gur
 
     # Time periods + target
     T1 = T + [ArrivalTimeTarget]
+    if DropUnusedY:
+        T1 = [ArrivalTimeTarget]
 
 
     # Retrieve the root node
@@ -39,7 +76,7 @@ def FireMIP(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, Gur
     
     
     # Model
-    Model = gp.Model()
+    Model = gp.Model(env=Env)
     Model.setParam("Threads", 1)
     Model.setParam("TimeLimit", TimeLimit)
     
@@ -68,8 +105,8 @@ def FireMIP(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, Gur
     # Binary variables
     # Q[a] = 1 if arc a appears in the tree
     Q = {a: Model.addVar(vtype=gp.GRB.BINARY) for a in A}
-    for a in A:
-        Model.addConstr(X[a] <= (len(N) - 1)*Q[a])
+    FlowOnlyInTree = {a: Model.addConstr(
+        X[a] <= (len(N) - 1)*Q[a]) for a in A}
         
     # Indicator variables
     # Y[n, t] = 1 if node n has burned by time t
@@ -96,8 +133,8 @@ def FireMIP(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, Gur
         (sum(ResAtTime[t] for t in ResAtTime) - 1)*Delay + EPS
 
     # Bound the slack on
-    for a in A:  # arcs that don't belong to the tree
-        Model.addConstr(S[a] <= BigM*(1 - Q[a]))
+    SlackOnlyOffTree = {a: Model.addConstr(  # arcs that don't belong to the tree
+        S[a] <= BigM*(1 - Q[a])) for a in A}
 
     # At most one resource per node
     AtMostOneResPernode = {n: Model.addConstr(
@@ -118,18 +155,191 @@ def FireMIP(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, Gur
     # Objective is the number of nodes burned by the target time
     Model.setObjective(gp.quicksum(
         Y[n, ArrivalTimeTarget] for n in N), gp.GRB.MINIMIZE)
+    
+    # Coupling families as lazy constraints
+    if LazyCoupling > 0:
+        for Family in [ResOnlyIfNotBurned, DoesBurn, FlowOnlyInTree, SlackOnlyOffTree]:
+            for Constr in Family.values():
+                Constr.Lazy = LazyCoupling
 
     # Solve problem
-    Model.optimize()
+    LoggedOptimize(Model, Log, "MIP")
     
     
     # Save results
     Model._Optimal = set(
         n for n in N for t in T if Z[n, t].x > .1)
+    Model._Solution = [(n, t) for (n, t) in Z if Z[n, t].x > .5]
     Model._ArrivalTime, Model._FirePath, Model._Pred = ShortestPaths(
         N, A, InArcs, OutArcs, Model._Optimal, Ignitions, Delay)
     Model._Burned = {n: Model._ArrivalTime[n] < ArrivalTimeTarget for n in N}
     
     
+    # Return model
+    return Model
+
+
+
+# --------------------------------------- #
+# --- MIP Formulation, matrix version --- #
+# --------------------------------------- #
+# The same formulation built with the matrix API: one addMVar per variable
+# family and one sparse constraint matrix per constraint family
+def FireMIPMatrix(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit,
+                  GurobiSeed, Env=None, DropUnusedY=False, Log=None, LazyCoupling=0):
+
+    # Epsilon
+    EPS = 0.0001
+
+    # Time periods
+    T = list(ResAtTime.keys())
+
+    # Time periods + target
+    T1 = T + [ArrivalTimeTarget]
+    if DropUnusedY:
+        T1 = [ArrivalTimeTarget]
+
+    # Retrieve the root node
+    assert len(Ignitions) == 1
+    RootNode = Ignitions[0]
+
+
+    # Node and arc indices
+    Index = {n: k for (k, n) in enumerate(N)}
+    Arcs = list(A)
+    Tail = np.array([Index[a[0]] for a in Arcs], dtype=np.int64)
+    Head = np.array([Index[a[1]] for a in Arcs], dtype=np.int64)
+    Weight = np.array([A[a] for a in Arcs], dtype=float)
+    nN, nA, nT, nT1 = len(N), len(Arcs), len(T), len(T1)
+    Root = Index[RootNode]
+
+    # Node-period pairs (n, t) are flattened to n * nT + t
+    NodeOfPair = np.repeat(np.arange(nN), nT)
+    PeriodOfPair = np.tile(np.arange(nT), nN)
+    NodeOfPair1 = np.repeat(np.arange(nN), nT1)
+    PeriodOfPair1 = np.tile(np.arange(nT1), nN)
+
+
+    # Model
+    Model = gp.Model(env=Env)
+    Model.setParam("Threads", 1)
+    Model.setParam("TimeLimit", TimeLimit)
+
+
+    # Seed if given
+    if type(GurobiSeed) is int:
+        Model.setParam("Seed", GurobiSeed)
+
+
+    # Flow variables
+    # X[a] the flow on arc a
+    X = Model.addMVar(nA)
+
+    # Dual variables
+    # Lambda[n] is the arrival time of fire at node n
+    LambdaLB = np.full(nN, -gp.GRB.INFINITY)
+    LambdaUB = np.full(nN, gp.GRB.INFINITY)
+    LambdaLB[Root] = LambdaUB[Root] = 0
+    Lambda = Model.addMVar(nN, lb=LambdaLB, ub=LambdaUB)
+
+    # Slack variables
+    S = Model.addMVar(nA)
+
+    # Resource allocation
+    Z = Model.addMVar(nN * nT, vtype=gp.GRB.BINARY)
+
+    # Binary variables
+    # Q[a] = 1 if arc a appears in the tree
+    Q = Model.addMVar(nA, vtype=gp.GRB.BINARY)
+    FlowOnlyInTree = Model.addConstr(X <= (nN - 1) * Q)
+
+    # Indicator variables
+    # Y[n, t] = 1 if node n has burned by time t
+    Y = Model.addMVar(nN * nT1, vtype=gp.GRB.BINARY)
+
+
+    # Node-arc incidence matrix, +1 on the head and -1 on the tail
+    Incidence = sp.csr_matrix(
+        (np.concatenate([np.ones(nA), -np.ones(nA)]),
+         (np.concatenate([Head, Tail]), np.tile(np.arange(nA), 2))), shape=(nN, nA))
+
+    # Ensure len(Nodes) - 1 paths leave the root node
+    RootOut = sp.csr_matrix(
+        (np.ones(np.sum(Tail == Root)), (np.zeros(np.sum(Tail == Root), dtype=np.int64),
+                                         np.flatnonzero(Tail == Root))), shape=(1, nA))
+    RootCon = Model.addConstr(RootOut @ X == nN - 1)
+
+    # Exactly one path ends at every other node
+    NotRoot = np.flatnonzero(np.arange(nN) != Root)
+    FlowConservation = Model.addConstr(Incidence[NotRoot] @ X == 1)
+
+    # Dual constraints, the delay applies to all periods of the tail
+    TailDelay = sp.csr_matrix(
+        (np.full(nA * nT, float(Delay)),
+         (np.repeat(np.arange(nA), nT), (Tail[:, None] * nT + np.arange(nT)).ravel())),
+        shape=(nA, nN * nT))
+    DualConstraint = Model.addConstr(
+        Incidence.T @ Lambda + S - TailDelay @ Z == Weight)
+
+    # Calculate Big M
+    BigM = (nN - 1)*Weight.max() + \
+        (sum(ResAtTime[t] for t in ResAtTime) - 1)*Delay + EPS
+
+    # Bound the slack on arcs that don't belong to the tree
+    SlackOnlyOffTree = Model.addConstr(S + BigM * Q <= BigM)
+
+    # At most one resource per node
+    PerNode = sp.csr_matrix(
+        (np.ones(nN * nT), (NodeOfPair, np.arange(nN * nT))), shape=(nN, nN * nT))
+    AtMostOneResPernode = Model.addConstr(PerNode @ Z <= 1)
+
+    # Up to ResAtTime[t] resources at time t
+    PerTime = sp.csr_matrix(
+        (np.ones(nN * nT), (PeriodOfPair, np.arange(nN * nT))), shape=(nT, nN * nT))
+    MaxRes = Model.addConstr(PerTime @ Z <= np.array([ResAtTime[t] for t in T]))
+
+    # Only put resources on unburned nodes,
+    # Z[n, t] <= 1 + (Lambda[n] - t)/t
+    LambdaOverT = sp.csr_matrix(
+        (1 / np.array(T, dtype=float)[PeriodOfPair], (np.arange(nN * nT), NodeOfPair)),
+        shape=(nN * nT, nN))
+    ResOnlyIfNotBurned = Model.addConstr(Z - LambdaOverT @ Lambda <= 0)
+
+    # Lambdas force the Y variables,
+    # Y[n, t] >= (t - Lambda[n])/t
+    LambdaOverT1 = sp.csr_matrix(
+        (1 / np.array(T1, dtype=float)[PeriodOfPair1], (np.arange(nN * nT1), NodeOfPair1)),
+        shape=(nN * nT1, nN))
+    DoesBurn = Model.addConstr(Y + LambdaOverT1 @ Lambda >= 1)
+
+    # Objective is the number of nodes burned by the target time
+    Model.setObjective((PeriodOfPair1 == nT1 - 1).astype(float) @ Y, gp.GRB.MINIMIZE)
+
+    # Coupling families as lazy constraints
+    if LazyCoupling > 0:
+        for Family in [ResOnlyIfNotBurned, DoesBurn, FlowOnlyInTree, SlackOnlyOffTree]:
+            Family.Lazy = np.full(Family.shape, LazyCoupling)
+
+    # Solve problem
+    LoggedOptimize(Model, Log, "MIP")
+
+
+    # Generate in- and outarcs
+    InArcs = {n: [] for n in N}
+    OutArcs = {n: [] for n in N}
+    for a in A:
+        OutArcs[a[0]].append((a[0], a[1]))
+        InArcs[a[1]].append((a[0], a[1]))
+
+    # Save results
+    ZValue = Z.X
+    Model._Optimal = set(N[k] for k in NodeOfPair[ZValue > .1])
+    Model._Solution = [(N[NodeOfPair[k]], T[PeriodOfPair[k]])
+                       for k in np.flatnonzero(ZValue > .5)]
+    Model._ArrivalTime, Model._FirePath, Model._Pred = ShortestPaths(
+        N, A, InArcs, OutArcs, Model._Optimal, Ignitions, Delay)
+    Model._Burned = {n: Model._ArrivalTime[n] < ArrivalTimeTarget for n in N}
+
+
     # Return model
     return Model
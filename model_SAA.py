@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Sample-average LBBD model for uncertain spread rates
+
+The master problem is the one of model_LBBD.py with one DoesBurn variable
+per node and scenario. In the callback the shortest path subproblems of all
+scenarios are solved in one batched pass, split over worker processes.
+
+"""
+
+# Packages
+from ensemble import EnsembleGraph, ArrivalPool, EnsembleArrivals, EvaluateEnsemble
+import gurobipy as gp
+import numpy as np
+import math
+import time
+
+
+# --------------------------------------- #
+# --- Sample-average LBBD Formulation --- #
+# --------------------------------------- #
+# Weights holds one row of arc weights per scenario, in the order of Arcs
+def FireSAALBBD(Nodes, Arcs, Weights, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
+                TimeLimit, GurobiSeed, ZStart, Workers):
+
+    # Epsilon
+    EPS = 0.0001
+
+    # Scenarios
+    S = len(Weights)
+
+    # Gurobi model
+    Model = gp.Model()
+    Model.setParam("Threads", 1)
+    Model.setParam("LazyConstraints", 1)
+
+    # Statistics
+    Model._ShortestPathProblemsSolved = 0
+    Model._OptimalityCuts = 0
+    Model._FeasibilityCuts = 0
+    Model._Callbacks = 0
+    Model._CallbackTime = 0
+
+
+    # Seed if one is given
+    if GurobiSeed is not None:
+        Model.setParam("Seed", GurobiSeed)
+
+
+    # Set time limit if given
+    if TimeLimit is not None:
+        Model.setParam("TimeLimit", TimeLimit)
+
+
+    # Graph in the scipy layout
+    Graph = EnsembleGraph(Nodes, Arcs, Ignitions)
+    Index = Graph["Index"]
+
+
+    # Decision variables
+    # IsResource[n, t] = 1 if we put
+    # a resource on node n at time t
+    IsResource = {(n, t): Model.addVar(
+        vtype=gp.GRB.BINARY) for n in Nodes for t in ResAtTime}
+
+
+    # Benders variables
+    # DoesBurn[n, s] = 1 if node n burns before
+    # the target time in scenario s
+    DoesBurn = {(n, s): Model.addVar(
+        vtype=gp.GRB.BINARY) for n in Nodes for s in range(S)}
+
+
+    # Constraints
+    # Up to Res[t] resources at time t
+    ResPerTime = {t: Model.addConstr(gp.quicksum(
+        IsResource[n, t] for n in Nodes) <= ResAtTime[t]) for t in ResAtTime}
+
+    # Up to one resource per node
+    ResPerNode = {n: Model.addConstr(gp.quicksum(
+        IsResource[n, t] for t in ResAtTime) <= 1) for n in Nodes}
+
+    # No resources at ignition node
+    for (n, t) in IsResource:
+        if n in Ignitions:
+            IsResource[n, t].ub = 0
+
+    # The objective is the expected number of burned nodes
+    Model.setObjective(gp.quicksum(DoesBurn[_] for _ in DoesBurn) / S,
+                       gp.GRB.MINIMIZE)
+
+
+    # Node indices on the fire path to node k, without the ignition
+    def FirePath(Pred, k):
+        Path = []
+        while Pred[k] >= 0:
+            Path.append(k)
+            k = Pred[k]
+        return Path[::-1]
+
+
+    # Add initial cuts
+    Model._ShortestPathProblemsSolved += S
+    ArrNone, PredNone = EnsembleArrivals(
+        None, 1, Graph, Weights, np.zeros(len(Nodes), dtype=bool), Delay)
+
+    # Cut on each node and scenario
+    for s in range(S):
+        for k in np.flatnonzero(ArrNone[s] < ArrivalTimeTarget):
+            n = Nodes[k]
+
+            # Minimum interdictions needed
+            Gap = ArrivalTimeTarget - ArrNone[s, k]
+            Required = math.ceil(Gap / Delay)
+
+            # Fire path expression
+            FirePathExpr = gp.quicksum(
+                IsResource[Nodes[kk], t] / Required for kk in FirePath(PredNone[s], k)[:-1]
+                for t in ResAtTime if t <= ArrNone[s, kk] + (Required - 1) * Delay)
+
+            # Add initial cut
+            Model.addConstr(DoesBurn[n, s] >= 1 - FirePathExpr)
+
+
+    # Worker processes for the subproblems
+    Pool = ArrivalPool(Graph, Weights, Delay, Workers)
+
+
+    # Callback
+    def Callback(model, where):
+        if where == gp.GRB.Callback.MIPSOL:
+            CallbackStart = time.perf_counter()
+
+            # Retrieve incumbent solution
+            IsResourceGet = model.cbGetSolution(IsResource)
+            DoesBurnGet = model.cbGetSolution(DoesBurn)
+            IsResourceV = {n: round(IsResourceGet[n]) for n in IsResourceGet}
+            DoesBurnV = {n: round(DoesBurnGet[n]) for n in DoesBurnGet}
+
+            # Deployment time of each node with a resource
+            Deployed = {}
+            for (n, t) in IsResourceV:
+                if IsResourceV[n, t] > .5:
+                    Deployed[n] = min(t, Deployed.get(n, t))
+            Placed = np.zeros(len(Nodes), dtype=bool)
+            Placed[[Index[n] for n in Deployed]] = True
+
+
+            # Solve the shortest path problems of all scenarios
+            Model._ShortestPathProblemsSolved += S
+            Dist, Pred = EnsembleArrivals(Pool, Workers, Graph, Weights, Placed, Delay)
+
+
+            for s in range(S):
+
+                # FEASIBILITY
+                for n, tt in Deployed.items():
+                    k = Index[n]
+                    if Dist[s, k] < tt:
+
+                        # Minimum interdictions needed
+                        Gap = tt - ArrNone[s, k]
+                        Required = math.ceil(Gap / Delay)
+
+                        # Fire path expression
+                        FirePathExpr = gp.quicksum(
+                            IsResource[Nodes[kk], t] for kk in FirePath(Pred[s], k)[:-1]
+                            for t in ResAtTime if t <= Dist[s, kk] +
+                            (Required - 1) * Delay if IsResourceV[Nodes[kk], t] < .5)
+
+                        # Feasibility cut
+                        Model.cbLazy(1 - IsResource[n, tt] + FirePathExpr / Required >= 1)
+                        Model._FeasibilityCuts += 1
+
+
+                # OPTIMALITY
+                for k in np.flatnonzero(Dist[s] < ArrivalTimeTarget - EPS):
+                    n = Nodes[k]
+                    if DoesBurnV[n, s] < 1 - EPS:
+
+                        # Find the minimum interdictions required
+                        Gap = ArrivalTimeTarget - Dist[s, k]
+                        Required = math.ceil(Gap / Delay)
+
+                        # Fire path expression
+                        FirePathExpr = gp.quicksum(
+                            IsResource[Nodes[kk], t] for kk in FirePath(Pred[s], k)[:-1]
+                            for t in ResAtTime if t <= Dist[s, kk] +
+                            (Required - 1) * Delay if IsResourceV[Nodes[kk], t] < .5)
+
+                        # Optimality cut
+                        Model.cbLazy(DoesBurn[n, s] >= 1 - FirePathExpr / Required)
+                        Model._OptimalityCuts += 1
+
+            # Callback statistics
+            Model._Callbacks += 1
+            Model._CallbackTime += time.perf_counter() - CallbackStart
+
+
+    # Starting solution
+    if ZStart is not None:
+        for _ in IsResource:
+            IsResource[_].Start = 0
+            if _ in ZStart:
+                IsResource[_].Start = 1
+
+        # Evaluate starting solution
+        Placed = np.zeros(len(Nodes), dtype=bool)
+        Placed[[Index[n] for (n, t) in ZStart]] = True
+        ArrStart, _ = EnsembleArrivals(Pool, Workers, Graph, Weights, Placed, Delay)
+        for (n, s) in DoesBurn:
+            DoesBurn[n, s].Start = int(ArrStart[s, Index[n]] < ArrivalTimeTarget)
+
+
+    # Solve
+    try:
+        Model.optimize(Callback)
+    finally:
+        if Pool is not None:
+            Pool.close()
+
+
+    # Save results
+    Model._Optimal = set(
+        n for n in Nodes for t in ResAtTime if IsResource[n, t].x > .1)
+    Model._Expected, Model._Worst, Model._Burned = EvaluateEnsemble(
+        Graph, Weights, Model._Optimal, Delay, ArrivalTimeTarget)
+
+
+    # Return model
+    return Model, [(n, t) for (n, t) in IsResource if IsResource[n, t].x > 0.5]
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Multilevel solves on coarsened grids
+
+The grid of (i, j) nodes is coarsened into Factor x Factor blocks. Two
+blocks are joined by an arc if any fine arc crosses between them, with
+weight Factor times the median weight of the crossing fine arcs, which is
+about the time the fire needs to cross a block. The coarsest level is
+solved with LBBD or the ILS, and its placement is projected down as the
+starting solution of the next finer level, up to the original grid.
+
+"""
+
+# Packages
+from rolling_horizon import ShiftedStart
+from shortest_paths import ShortestPaths
+from IteratedLocalSearch import FireILS, ILSParameters
+from model_LBBD import FireLBBD
+import numpy as np
+
+
+# ---------------------- #
+# --- Coarsen a grid --- #
+# ---------------------- #
+# Returns the coarse nodes, arcs and ignitions and the block of each fine node
+def CoarsenGrid(Nodes, Arcs, Ignitions, Factor):
+    Block = {(i, j): (i // Factor, j // Factor) for (i, j) in Nodes}
+
+    # Weights of the fine arcs between each pair of blocks
+    Crossing = {}
+    for (u, v) in Arcs:
+        if Block[u] != Block[v]:
+            Crossing.setdefault((Block[u], Block[v]), []).append(Arcs[u, v])
+
+    CoarseNodes = sorted(set(Block.values()))
+    CoarseArcs = {a: Factor * float(np.median(Crossing[a])) for a in Crossing}
+    CoarseIgnitions = list(dict.fromkeys(Block[n] for n in Ignitions))
+    return CoarseNodes, CoarseArcs, CoarseIgnitions, Block
+
+
+def InOutArcs(Nodes, Arcs):
+    InArcs = {n: [] for n in Nodes}
+    OutArcs = {n: [] for n in Nodes}
+    for a in Arcs:
+        OutArcs[a[0]].append((a[0], a[1]))
+        InArcs[a[1]].append((a[0], a[1]))
+    return InArcs, OutArcs
+
+
+# -------------------------- #
+# --- Project a solution --- #
+# -------------------------- #
+# Each coarse resource, by deployment time, goes to the node of its block
+# that the fire reaches first but not before the deployment time, given the
+# resources projected so far. Parent maps each fine node to its coarse node.
+def ProjectPlacement(CoarsePlacement, Parent, Nodes, Arcs, InArcs, OutArcs,
+                     ResAtTime, Ignitions, Delay):
+    Members = {}
+    for n in Nodes:
+        if n not in Ignitions:
+            Members.setdefault(Parent[n], []).append(n)
+
+    Placement = []
+    for (B, t) in sorted(CoarsePlacement, key=lambda _: _[1]):
+        ArrivalTime, _, __ = ShortestPaths(
+            Nodes, Arcs, InArcs, OutArcs, set(n for (n, tt) in Placement),
+            Ignitions, Delay)
+        Used = set(n for (n, tt) in Placement)
+        Candidates = [(ArrivalTime[n], n) for n in Members.get(B, [])
+                      if n not in Used and ArrivalTime[n] >= t]
+        if len(Candidates) > 0:
+            Placement.append((min(Candidates)[1], t))
+
+    # Drop resources that burn before deployment
+    return ShiftedStart(Nodes, Arcs, InArcs, OutArcs, Placement, Ignitions,
+                        set(), ResAtTime, Delay, 0)
+
+
+# ---------------------------- #
+# --- Solve level by level --- #
+# ---------------------------- #
+# Factors are the block sizes from coarsest to finest, each a multiple of
+# the next, e.g. [4, 2]; the original grid is solved last. Method and
+# TimeLimit are given once or per level (coarsest first, original last).
+# Method is "LBBD" or "ILS", the ILS uses Parameters or the defaults of
+# IteratedLocalSearch.py. Returns the placement, its objective and the
+# (factor, objective, placement) of every level.
+def MultilevelSolve(Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
+                    Factors, Method, TimeLimit, Seed=0, Parameters=None):
+    Parameters = {**ILSParameters, **(Parameters or {})}
+    Levels = len(Factors) + 1
+    if not isinstance(Method, list):
+        Method = [Method] * Levels
+    if not isinstance(TimeLimit, list):
+        TimeLimit = [TimeLimit] * Levels
+
+    # Instances from coarsest to finest
+    Instances = []
+    for Factor in Factors:
+        Instances.append((Factor, *CoarsenGrid(Nodes, Arcs, Ignitions, Factor)))
+    Instances.append((1, Nodes, Arcs, Ignitions, {n: n for n in Nodes}))
+
+    History = []
+    Placement = None
+    for k, (Factor, LNodes, LArcs, LIgnitions, Block) in enumerate(Instances):
+        InArcs, OutArcs = InOutArcs(LNodes, LArcs)
+
+        # Starting solution from the coarser level, which may hold fewer
+        # resources than ResAtTime, the ILS places the missing ones
+        ZStart = None
+        if Placement is not None:
+            Coarser = Instances[k - 1][4]
+            Parent = {Block[n]: Coarser[n] for n in Nodes}
+            ZStart = ProjectPlacement(Placement, Parent, LNodes, LArcs, InArcs,
+                                      OutArcs, ResAtTime, LIgnitions, Delay)
+
+        if Method[k] == "LBBD":
+            Model, Placement = FireLBBD(
+                LNodes, LArcs, ResAtTime, LIgnitions, Delay, ArrivalTimeTarget,
+                TimeLimit[k], Seed, ZStart, False, InArcs=InArcs, OutArcs=OutArcs)
+            ObjVal = Model.objVal
+        elif Method[k] == "ILS":
+            np.random.seed(Seed)
+            ZSol, ObjVal = FireILS(
+                LNodes, LArcs, ResAtTime, LIgnitions, Delay, ArrivalTimeTarget,
+                Parameters["MultiStarts"], Parameters["p1"], Parameters["p2"],
+                Parameters["MaxNeighbours"], Parameters["MaxModifications"],
+                Parameters["MaxFailures"], Parameters["MaxNoImprovements"],
+                Parameters["MaxCandidates"], ZStart, None, InArcs, OutArcs,
+                TimeLimit[k])
+            Placement = [(n, t) for (n, t) in ZSol if ZSol[n, t] > .5]
+        else:
+            raise ValueError(f"Unknown method {Method[k]}")
+
+        History.append((Factor, ObjVal, Placement))
+
+    return Placement, ObjVal, History
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Rolling-horizon re-solves
+
+After Elapsed time units the fire has reached new nodes and some resources
+are on the ground. The same landscape is re-solved with the burning nodes as
+ignitions, the placed resources as committed delays, the remaining resources
+and the times shifted so that the re-solve starts at time 0. Each burning
+node ignites at the time it started burning in the shifted times, at most 0
+(see BurningAt), so the fire already spreading from it is kept. The previous
+solution is the starting solution, and for LBBD the fire paths of the
+previous optimality cuts become initial cuts.
+
+"""
+
+# Packages
+from shortest_paths import ShortestPaths
+from IteratedLocalSearch import FireILS
+from model_LBBD import FireLBBD
+
+
+# ------------------------- #
+# --- Burning nodes now --- #
+# ------------------------- #
+# Nodes the fire has reached after Elapsed time units with the resources
+# in Committed, by the time they started burning in the shifted times. The
+# result is the Ignitions of the re-solve.
+def BurningAt(Nodes, Arcs, InArcs, OutArcs, Committed, Ignitions, Delay, Elapsed):
+    ArrivalTime, _, __ = ShortestPaths(
+        Nodes, Arcs, InArcs, OutArcs, Committed, Ignitions, Delay)
+    return {n: ArrivalTime[n] - Elapsed for n in Nodes if ArrivalTime[n] <= Elapsed}
+
+
+# --------------------------------- #
+# --- Shift a previous solution --- #
+# --------------------------------- #
+# Remaining placements of a previous solution, shifted to the new time origin,
+# within the remaining resources and without resources that burn before their
+# deployment time. Removing a resource can make others burn earlier, so this
+# repeats until the placement is feasible.
+def ShiftedStart(Nodes, Arcs, InArcs, OutArcs, PreviousSolution, Ignitions,
+                 Committed, ResAtTime, Delay, Elapsed):
+    Start = []
+    Used = {t: 0 for t in ResAtTime}
+    for (n, t) in sorted(PreviousSolution, key=lambda _: _[1]):
+        if n in Committed or n in Ignitions or t - Elapsed not in ResAtTime:
+            continue
+        if Used[t - Elapsed] < ResAtTime[t - Elapsed]:
+            Used[t - Elapsed] += 1
+            Start.append((n, t - Elapsed))
+
+    while True:
+        ArrivalTime, _, __ = ShortestPaths(
+            Nodes, Arcs, InArcs, OutArcs, set(n for (n, t) in Start), Ignitions, Delay)
+        Feasible = [(n, t) for (n, t) in Start if ArrivalTime[n] >= t]
+        if len(Feasible) == len(Start):
+            return Start
+        Start = Feasible
+
+
+# The part of a fire path that starts at the last burning node on it
+def PathSuffix(Path, Ignitions):
+    for k in range(len(Path) - 1, -1, -1):
+        if Path[k] in Ignitions:
+            return Path[k:]
+    return None
+
+
+# ---------------------------- #
+# --- Rolling-horizon LBBD --- #
+# ---------------------------- #
+# Previous is the model returned by FireLBBD and PreviousSolution its list of
+# (node, time) placements. Ignitions are the burning nodes from BurningAt,
+# Committed holds every node with a resource on the ground, and ResAtTime
+# the remaining resources in the shifted times.
+def RollingLBBD(Previous, PreviousSolution, Ignitions, Committed, ResAtTime, Elapsed,
+                TimeLimit, GurobiSeed, Heuristic=False):
+    Nodes = Previous._Nodes
+    Arcs = Previous._Arcs
+    Delay = Previous._Delay
+    ArrivalTimeTarget = Previous._ArrivalTimeTarget - Elapsed
+
+    # Committed resources delay the fire on their outarcs
+    DelayedArcs = {a: Arcs[a] + Delay * int(a[0] in Committed) for a in Arcs}
+
+    # Previous incumbent as starting solution
+    ZStart = ShiftedStart(Nodes, DelayedArcs, Previous._InArcs, Previous._OutArcs,
+                          PreviousSolution, Ignitions, Committed, ResAtTime,
+                          Delay, Elapsed)
+
+    # Previous fire paths from the nodes that are burning now
+    FirePaths = set()
+    for Path in Previous._FirePaths:
+        Suffix = PathSuffix(Path, Ignitions)
+        if Suffix is not None and len(Suffix) > 1:
+            FirePaths.add(tuple(Suffix))
+
+    return FireLBBD(
+        Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit,
+        GurobiSeed, ZStart, Heuristic, Committed, [list(_) for _ in FirePaths],
+        Previous._InArcs, Previous._OutArcs)
+
+
+# --------------------------- #
+# --- Rolling-horizon ILS --- #
+# --------------------------- #
+# Arguments as for RollingLBBD, with the instance and ILS parameters
+def RollingILS(Nodes, Arcs, PreviousSolution, Ignitions, Committed, ResAtTime, Delay,
+               ArrivalTimeTarget, Elapsed, p1, p2, MaxNeighbours, MaxModifications,
+               MaxFailures, MaxNoImprovements, MaxCandidates, InArcs=None, OutArcs=None):
+
+    # Generate in- and outarcs
+    if InArcs is None or OutArcs is None:
+        InArcs = {n: [] for n in Nodes}
+        OutArcs = {n: [] for n in Nodes}
+        for a in Arcs:
+            OutArcs[a[0]].append((a[0], a[1]))
+            InArcs[a[1]].append((a[0], a[1]))
+
+    # Previous solution as starting solution
+    DelayedArcs = {a: Arcs[a] + Delay * int(a[0] in Committed) for a in Arcs}
+    ZStart = ShiftedStart(Nodes, DelayedArcs, InArcs, OutArcs, PreviousSolution,
+                          Ignitions, Committed, ResAtTime, Delay, Elapsed)
+
+    ZSol, ObjVal = FireILS(
+        Nodes, Arcs, ResAtTime, Ignitions, Delay, ArrivalTimeTarget - Elapsed,
+        None, p1, p2, MaxNeighbours, MaxModifications, MaxFailures,
+        MaxNoImprovements, MaxCandidates, ZStart, Committed, InArcs, OutArcs)
+
+    return [(n, t) for (n, t) in ZSol if ZSol[n, t] > 0.5], ObjVal
@@ -7,6 +7,15 @@ Implementation of Dijkstra's algorithm using heapq
 # Packages
 import heapq
 
+
+# Ignitions are a list of nodes that ignite at time 0, or a dict of the
+# time each node ignites, below 0 for fires that started before time 0
+def IgnitionTimes(Ignitions):
+    if isinstance(Ignitions, dict):
+        return Ignitions
+    return dict.fromkeys(Ignitions, 0)
+
+
 # Dijkstra's Algorithm
 def ShortestPaths(Nodes, Arcs, InArcs, OutArcs, PlacedRes, Ignitions, Delay):
     
@@ -21,15 +30,17 @@ def ShortestPaths(Nodes, Arcs, InArcs, OutArcs, PlacedRes, Ignitions, Delay):
     FirePath = {n: None for n in Nodes}
 
     # Ignitions
-    for n in Ignitions:
-        ArrivalTime[n] = 0
+    Start = IgnitionTimes(Ignitions)
+    for n in Start:
+        ArrivalTime[n] = Start[n]
         FirePath[n] = []
 
     # Predecessors
     Pred = {n: None for n in Nodes}
 
     # Priority queue
-    Queue = [(0, n) for n in Ignitions]
+    Queue = [(Start[n], n) for n in Start]
+    heapq.heapify(Queue)
 
     # Dijkstra
     while len(Queue) > 0:
@@ -46,4 +57,178 @@ def ShortestPaths(Nodes, Arcs, InArcs, OutArcs, PlacedRes, Ignitions, Delay):
                 heapq.heappush(Queue, (Dist, Neigh))
 
     # Return distances and predecessors
-    return ArrivalTime, FirePath, Pred
\ No newline at end of file
+    return ArrivalTime, FirePath, Pred
+
+
+# Number of nodes burned before the target time, without fire paths.
+# The search stops at ArrivalTimeTarget (or Horizon if later) and gives up
+# as soon as more than Cutoff nodes have burned. Arrival times below the
+# stopping time are exact, the others are at least the stopping time.
+def BurnedCount(Nodes, Arcs, OutArcs, PlacedRes, Ignitions, Delay,
+                ArrivalTimeTarget, Cutoff=float("inf"), Horizon=None):
+    Stop = ArrivalTimeTarget if Horizon is None else max(Horizon, ArrivalTimeTarget)
+    
+    # Distances
+    ArrivalTime = dict.fromkeys(Nodes, float("inf"))
+    Start = IgnitionTimes(Ignitions)
+    for n in Start:
+        ArrivalTime[n] = Start[n]
+
+    # Priority queue
+    Queue = [(Start[n], n) for n in Start]
+    heapq.heapify(Queue)
+    
+    # Dijkstra
+    Count = 0
+    while len(Queue) > 0:
+        CurrentDist, CurrentNode = heapq.heappop(Queue)
+        if CurrentDist > ArrivalTime[CurrentNode]:
+            continue
+        if CurrentDist >= Stop:
+            break
+        
+        # Give up once the cutoff is exceeded
+        if CurrentDist < ArrivalTimeTarget:
+            Count += 1
+            if Count > Cutoff:
+                break
+        
+        Extra = Delay * int(CurrentNode in PlacedRes)
+        for (_, Neigh) in OutArcs[CurrentNode]:
+            Dist = CurrentDist + (Arcs[CurrentNode, Neigh] + Extra)
+            if Dist < ArrivalTime[Neigh]:
+                ArrivalTime[Neigh] = Dist
+                heapq.heappush(Queue, (Dist, Neigh))
+    
+    return Count, ArrivalTime
+
+
+# Number of nodes burned before the target time below each candidate in the
+# shortest path tree given by Children. A resource on a node only delays the
+# fire in its subtree, so nodes with no burned nodes below cannot save any.
+# Nodes that do not burn have nothing burned below them, so the search stops
+# there, and candidates below others are scored first and reused, so each
+# burned node is visited once.
+def SubtreeScores(Candidates, ArrivalTime, Children, ArrivalTimeTarget):
+    Score = {}
+    for c in sorted(Candidates, key=lambda n: -ArrivalTime[n]):
+        Score[c] = 0
+        Stack = list(Children[c])
+        while len(Stack) > 0:
+            n = Stack.pop()
+            if ArrivalTime[n] >= ArrivalTimeTarget:
+                continue
+            Score[c] += 1
+            if n in Score:
+                Score[c] += Score[n]
+            else:
+                Stack.extend(Children[n])
+    
+    return Score
+
+
+
+# Children of each node in the shortest path tree given by Pred
+def TreeChildren(Nodes, Pred):
+    Children = {n: set() for n in Nodes}
+    for n in Nodes:
+        if Pred[n] is not None:
+            Children[Pred[n]].add(n)
+    return Children
+
+
+# Adds a resource on Node and updates ArrivalTime, Pred and Children in
+# place. Only the nodes below Node in the shortest path tree can burn later,
+# so only they are recomputed, from the arcs that enter them from outside.
+# The arrival times are the same as those of ShortestPaths.
+def PlaceResource(Arcs, InArcs, OutArcs, ArrivalTime, Pred, Children, PlacedRes,
+                  Node, Delay):
+    PlacedRes.add(Node)
+    
+    # Nodes below Node, cut out of the tree
+    Below = []
+    Stack = list(Children[Node])
+    while len(Stack) > 0:
+        n = Stack.pop()
+        Below.append(n)
+        Stack.extend(Children[n])
+    Inside = set(Below)
+    Children[Node] = set()
+    for n in Below:
+        Children[n] = set()
+        ArrivalTime[n] = float("inf")
+        Pred[n] = None
+    
+    # Earliest arrival from outside
+    Queue = []
+    for n in Below:
+        for (u, _) in InArcs[n]:
+            if u not in Inside:
+                Dist = ArrivalTime[u] + (Arcs[u, n] + Delay * int(u in PlacedRes))
+                if Dist < ArrivalTime[n]:
+                    ArrivalTime[n] = Dist
+                    Pred[n] = u
+        if Pred[n] is not None:
+            Queue.append((ArrivalTime[n], n))
+    heapq.heapify(Queue)
+    
+    # Dijkstra inside the cut out nodes
+    while len(Queue) > 0:
+        CurrentDist, CurrentNode = heapq.heappop(Queue)
+        if CurrentDist > ArrivalTime[CurrentNode]:
+            continue
+        
+        Extra = Delay * int(CurrentNode in PlacedRes)
+        for (_, Neigh) in OutArcs[CurrentNode]:
+            if Neigh in Inside:
+                Dist = CurrentDist + (Arcs[CurrentNode, Neigh] + Extra)
+                if Dist < ArrivalTime[Neigh]:
+                    ArrivalTime[Neigh] = Dist
+                    Pred[Neigh] = CurrentNode
+                    heapq.heappush(Queue, (Dist, Neigh))
+    
+    # Put them back into the tree
+    for n in Below:
+        if Pred[n] is not None:
+            Children[Pred[n]].add(n)
+
+
+# Removes the resource on Node and updates ArrivalTime, Pred and Children in
+# place. The fire only gets faster on the outarcs of Node, so the nodes it
+# reaches earlier are found by a Dijkstra from Node that stops where nothing
+# improves. Returns the changes as (node, arrival time, predecessor) before
+# each, for RestoreTree.
+def RemoveResource(Arcs, OutArcs, ArrivalTime, Pred, Children, PlacedRes, Node, Delay):
+    PlacedRes.discard(Node)
+    Changes = []
+    
+    Queue = [(ArrivalTime[Node], Node)]
+    while len(Queue) > 0:
+        CurrentDist, CurrentNode = heapq.heappop(Queue)
+        if CurrentDist > ArrivalTime[CurrentNode]:
+            continue
+        
+        Extra = Delay * int(CurrentNode in PlacedRes)
+        for (_, Neigh) in OutArcs[CurrentNode]:
+            Dist = CurrentDist + (Arcs[CurrentNode, Neigh] + Extra)
+            if Dist < ArrivalTime[Neigh]:
+                Changes.append((Neigh, ArrivalTime[Neigh], Pred[Neigh]))
+                if Pred[Neigh] is not None:
+                    Children[Pred[Neigh]].discard(Neigh)
+                Children[CurrentNode].add(Neigh)
+                ArrivalTime[Neigh] = Dist
+                Pred[Neigh] = CurrentNode
+                heapq.heappush(Queue, (Dist, Neigh))
+    
+    return Changes
+
+
+# Puts the resource on Node back and undoes the changes of RemoveResource
+def RestoreTree(Changes, ArrivalTime, Pred, Children, PlacedRes, Node):
+    PlacedRes.add(Node)
+    for (n, Arrival, Parent) in reversed(Changes):
+        Children[Pred[n]].discard(n)
+        if Parent is not None:
+            Children[Parent].add(n)
+        ArrivalTime[n] = Arrival
+        Pred[n] = Parent
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Long-lived local solver service
+
+Keeps parsed instances, their in- and outarcs and one Gurobi environment
+per worker in memory, and answers jobs over a Unix socket or a localhost
+TCP port. A job is one JSON object per line and gets one JSON line back.
+
+    python solver_service.py --socket /tmp/fire.sock --workers 2
+
+    {"job": "evaluate", "instance": "instances/small/10/S0_0.json",
+     "placement": [[[3, 4], 10], [[5, 6], 20]]}
+    {"job": "ils" | "greedy" | "lbbd" | "mip", "instance": ...,
+     "time_limit": 60, "seed": 0, "start": [[[3, 4], 10]], "params": {...}}
+
+Jobs run in a pool of worker processes, each with its own Gurobi
+environment and instance cache, so at most that many solves run at once and
+in parallel. Evaluate jobs need no environment and run in a separate pool,
+so they are not queued behind the solves. The time limit of a greedy job
+covers all of its iterations, and each ILS job draws from its own random
+state, so it is reproducible from its seed.
+
+"""
+
+# Packages
+from shortest_paths import BurnedCount
+from IteratedLocalSearch import FireILS, ILSParameters
+from model_LBBD import FireLBBD
+from model_MIP import FireMIP
+from concurrent.futures import ProcessPoolExecutor
+from ast import literal_eval
+from pathlib import Path
+import multiprocessing as mp
+import gurobipy as gp
+import numpy as np
+import argparse
+import asyncio
+import socket
+import json
+import time
+
+
+def Load(Instance):
+    with open(Instance, 'r') as file:
+        Data = json.load(file)
+        Delay = Data["Delay"]
+        ArrivalTimeTarget = Data["ArrivalTimeTarget"]
+        ResAtTime = {literal_eval(t): Data["ResAtTime"][t] for t in Data["ResAtTime"]}
+        Ignitions = [tuple(n) for n in Data["Ignitions"]]
+        N = [tuple(n) for n in Data["Nodes"]]
+        A = {literal_eval(a): Data["Arcs"][a] for a in Data["Arcs"]}
+
+    return N, A, Ignitions, Delay, ArrivalTimeTarget, ResAtTime
+
+
+# ---------------------- #
+# --- Instance cache --- #
+# ---------------------- #
+# Parsed instances and their arc lists, reloaded if the file changes
+Instances = {}
+
+
+def CachedInstance(File):
+    File = Path(File).resolve()
+    Modified = File.stat().st_mtime
+    if File not in Instances or Instances[File][0] != Modified:
+        N, A, Ignitions, Delay, ArrivalTimeTarget, ResAtTime = Load(File)
+        InArcs = {n: [] for n in N}
+        OutArcs = {n: [] for n in N}
+        for a in A:
+            OutArcs[a[0]].append((a[0], a[1]))
+            InArcs[a[1]].append((a[0], a[1]))
+        Instances[File] = (Modified, (N, A, Ignitions, Delay, ArrivalTimeTarget,
+                                      ResAtTime, InArcs, OutArcs))
+    return Instances[File][1]
+
+
+# Placements are sent as [[i, j], t] pairs
+def ReadPlacement(Placement):
+    return [(tuple(n), t) for (n, t) in Placement]
+
+
+def WritePlacement(Placement):
+    return [[list(n), t] for (n, t) in Placement]
+
+
+# --------------- #
+# --- Workers --- #
+# --------------- #
+# Gurobi environment of a worker process, the instance cache is per process
+WorkerEnv = None
+
+
+def StartWorker(WithEnv):
+    global WorkerEnv
+    if WithEnv:
+        WorkerEnv = gp.Env(empty=True)
+        WorkerEnv.setParam("OutputFlag", 0)
+        WorkerEnv.start()
+
+
+# ------------ #
+# --- Jobs --- #
+# ------------ #
+def RunJob(Job, DefaultTimeLimit):
+    N, A, Ignitions, Delay, ArrivalTimeTarget, ResAtTime, InArcs, OutArcs = \
+        CachedInstance(Job["instance"])
+    TimeLimit = Job.get("time_limit", DefaultTimeLimit)
+    Seed = Job.get("seed", 0)
+    Start = None if "start" not in Job else ReadPlacement(Job["start"])
+    StartTime = time.time()
+
+    # Number of burned nodes and feasibility of a placement
+    if Job["job"] == "evaluate":
+        Placement = ReadPlacement(Job["placement"])
+        Used = {}
+        for (n, t) in Placement:
+            Used[t] = Used.get(t, 0) + 1
+        Over = sorted(t for t in Used if Used[t] > ResAtTime.get(t, 0))
+        if len(Over) > 0:
+            raise ValueError(f"More resources than available at times {Over}")
+        if len(set(n for (n, t) in Placement)) < len(Placement):
+            raise ValueError("More than one resource on a node")
+        OnIgnitions = sorted(n for (n, t) in Placement if n in Ignitions)
+        if len(OnIgnitions) > 0:
+            raise ValueError(f"Resources on ignitions {OnIgnitions}")
+        ObjVal, ArrivalTime = BurnedCount(
+            N, A, OutArcs, set(n for (n, t) in Placement), Ignitions, Delay,
+            ArrivalTimeTarget, Horizon=max([t for (n, t) in Placement], default=0))
+        return {"objective": ObjVal, "runtime": time.time() - StartTime,
+                "feasible": all(ArrivalTime[n] >= t for (n, t) in Placement)}
+
+    if Job["job"] == "ils":
+        Parameters = {**ILSParameters, **Job.get("params", {})}
+        ZSol, ObjVal = FireILS(
+            N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
+            Parameters["MultiStarts"], Parameters["p1"], Parameters["p2"],
+            Parameters["MaxNeighbours"], Parameters["MaxModifications"],
+            Parameters["MaxFailures"], Parameters["MaxNoImprovements"],
+            Parameters["MaxCandidates"], Start, None, InArcs, OutArcs, TimeLimit,
+            Random=np.random.RandomState(Seed))
+        return {"objective": ObjVal, "runtime": time.time() - StartTime,
+                "placement": WritePlacement((n, t) for (n, t) in ZSol if ZSol[n, t] > .5)}
+
+    if Job["job"] in ["greedy", "lbbd"]:
+        Model, Placement = FireLBBD(
+            N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget, TimeLimit, Seed,
+            Start, Job["job"] == "greedy", InArcs=InArcs, OutArcs=OutArcs,
+            Env=WorkerEnv, SplitTimeLimit=True)
+        return {"objective": Model.objVal, "bound": Model.ObjBound,
+                "runtime": time.time() - StartTime, "placement": WritePlacement(Placement)}
+
+    if Job["job"] == "mip":
+        Model = FireMIP(N, A, ResAtTime, Ignitions, Delay, ArrivalTimeTarget,
+                        TimeLimit, Seed, WorkerEnv)
+        return {"objective": Model.objVal, "bound": Model.ObjBound,
+                "runtime": time.time() - StartTime,
+                "placement": WritePlacement(Model._Solution)}
+
+    raise ValueError(f"Unknown job {Job['job']}")
+
+
+# -------------- #
+# --- Server --- #
+# -------------- #
+async def Serve(Socket, Port, Workers, DefaultTimeLimit):
+    Context = mp.get_context("spawn")
+    Solvers = ProcessPoolExecutor(Workers, Context, StartWorker, (True,))
+    Evaluators = ProcessPoolExecutor(Workers, Context, StartWorker, (False,))
+
+    async def Handle(Reader, Writer):
+        while Line := await Reader.readline():
+            try:
+                Job = json.loads(Line)
+                Pool = Evaluators if Job.get("job") == "evaluate" else Solvers
+                Result = await asyncio.get_running_loop().run_in_executor(
+                    Pool, RunJob, Job, DefaultTimeLimit)
+                Reply = {"ok": True, **Result}
+            except Exception as Error:
+                Reply = {"ok": False, "error": f"{type(Error).__name__}: {Error}"}
+            Writer.write((json.dumps(Reply) + "\n").encode())
+            await Writer.drain()
+        Writer.close()
+
+    if Socket is not None:
+        Server = await asyncio.start_unix_server(Handle, Socket)
+    else:
+        Server = await asyncio.start_server(Handle, "127.0.0.1", Port)
+    print("Serving on", Socket or f"127.0.0.1:{Port}")
+    async with Server:
+        await Server.serve_forever()
+
+
+# Send one job and wait for the reply
+def SendJob(Job, Socket=None, Port=None):
+    if Socket is not None:
+        Connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        Connection.connect(str(Socket))
+    else:
+        Connection = socket.create_connection(("127.0.0.1", Port))
+    with Connection, Connection.makefile('rw') as file:
+        file.write(json.dumps(Job) + "\n")
+        file.flush()
+        return json.loads(file.readline())
+
+
+if __name__ == "__main__":
+    Parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    Address = Parser.add_mutually_exclusive_group(required=True)
+    Address.add_argument("--socket", help="Unix socket path")
+    Address.add_argument("--port", type=int, help="localhost TCP port")
+    Parser.add_argument("--workers", type=int, default=2, help="jobs run at once")
+    Parser.add_argument("--time-limit", type=float, default=60,
+                        help="default time limit per job (s)")
+    Args = Parser.parse_args()
+
+    asyncio.run(Serve(Args.socket, Args.port, Args.workers, Args.time_limit))
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the synthetic landscape generator
+
+"""
+
+# Packages
+from generator import GenerateLandscape
+import pytest
+
+
+# The default deployment periods are distinct, increasing and before the target
+@pytest.mark.parametrize("Rows, Cols", [(12, 5), (13, 13), (20, 30), (64, 64)])
+def test_default_periods_before_target(Rows, Cols):
+    _, __, ___, Delay, ArrivalTimeTarget, ResAtTime = GenerateLandscape(Rows, Cols)
+    Periods = list(ResAtTime)
+    assert len(Periods) == 2
+    assert 1 <= Periods[0] < Periods[1] < ArrivalTimeTarget
+    assert Delay >= 1
+
+
+def test_small_grid_without_schedule_raises():
+    with pytest.raises(ValueError):
+        GenerateLandscape(6, 7)
+
+
+def test_small_grid_with_schedule():
+    Nodes, _, Ignitions, __, ArrivalTimeTarget, ResAtTime = GenerateLandscape(
+        6, 7, ArrivalTimeTarget=6, ResAtTime={2: 1, 4: 1})
+    assert len(Nodes) == 42 and len(Ignitions) == 1
+    assert ArrivalTimeTarget == 6 and ResAtTime == {2: 1, 4: 1}
+
+    # A target given without a schedule gets default periods below it
+    _, __, ___, ____, ArrivalTimeTarget, ResAtTime = GenerateLandscape(
+        6, 7, ArrivalTimeTarget=5)
+    assert sorted(ResAtTime) == [1, 3]
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the rolling-horizon re-solves
+
+"""
+
+# Packages
+from rolling_horizon import BurningAt, ShiftedStart, RollingLBBD
+from shortest_paths import ShortestPaths, BurnedCount
+from model_LBBD import FireLBBD, FirePathCut, Interdictions
+from generator import GenerateLandscape
+import pytest
+
+
+def Instance(Seed):
+    Nodes, Arcs, Ignitions, Delay, ArrivalTimeTarget, ResAtTime = GenerateLandscape(
+        9, 9, 8, "uniform", (1/3, 1), 1, 3, 10, {2: 1, 4: 2, 6: 1}, Seed=Seed)
+    InArcs = {n: [] for n in Nodes}
+    OutArcs = {n: [] for n in Nodes}
+    for a in Arcs:
+        OutArcs[a[0]].append((a[0], a[1]))
+        InArcs[a[1]].append((a[0], a[1]))
+    return Nodes, Arcs, InArcs, OutArcs, Ignitions, Delay, ArrivalTimeTarget, ResAtTime
+
+
+# A feasible plan, the first nodes the fire reaches after each deployment time
+def Plan(Nodes, Arcs, InArcs, OutArcs, Ignitions, Delay, ResAtTime):
+    ArrivalTime, _, __ = ShortestPaths(Nodes, Arcs, InArcs, OutArcs, set(), Ignitions, Delay)
+    Placement = []
+    for t in sorted(ResAtTime):
+        Used = set(n for (n, tt) in Placement)
+        Free = sorted((ArrivalTime[n], n) for n in Nodes
+                      if ArrivalTime[n] >= t and n not in Used)
+        Placement += [(n, t) for (_, n) in Free[:ResAtTime[t]]]
+    return ShiftedStart(Nodes, Arcs, InArcs, OutArcs, Placement, Ignitions, set(),
+                        ResAtTime, Delay, 0)
+
+
+@pytest.mark.parametrize("Seed", range(10))
+def test_rolling_evaluation_equals_one_shot(Seed):
+    Nodes, Arcs, InArcs, OutArcs, Ignitions, Delay, ArrivalTimeTarget, ResAtTime = \
+        Instance(Seed)
+    Placement = Plan(Nodes, Arcs, InArcs, OutArcs, Ignitions, Delay, ResAtTime)
+    OneShot, _ = BurnedCount(Nodes, Arcs, OutArcs, set(n for (n, t) in Placement),
+                             Ignitions, Delay, ArrivalTimeTarget)
+
+    for Elapsed in [1, 2, 3.5, 5]:
+        Committed = set(n for (n, t) in Placement if t <= Elapsed)
+        Remaining = set(n for (n, t) in Placement if t > Elapsed)
+        Burning = BurningAt(Nodes, Arcs, InArcs, OutArcs, Committed, Ignitions,
+                            Delay, Elapsed)
+        DelayedArcs = {a: Arcs[a] + Delay * int(a[0] in Committed) for a in Arcs}
+        Rolling, _ = BurnedCount(Nodes, DelayedArcs, OutArcs, Remaining, Burning,
+                                 Delay, ArrivalTimeTarget - Elapsed)
+        assert Rolling == OneShot
+
+
+def test_fire_path_cut_starts_at_ignition_time():
+    Nodes, Arcs, InArcs, OutArcs, Ignitions, Delay, ArrivalTimeTarget, ResAtTime = \
+        Instance(0)
+    Burning = BurningAt(Nodes, Arcs, InArcs, OutArcs, set(), Ignitions, Delay, 2)
+    ArrivalTime, FirePath, Pred = ShortestPaths(
+        Nodes, Arcs, InArcs, OutArcs, set(), Burning, Delay)
+
+    # Paths from the burning nodes keep the arrival times of the one-shot fire
+    for n in Nodes:
+        if n not in Burning and ArrivalTime[n] < ArrivalTimeTarget - 2:
+            Path = [Pred[FirePath[n][0]]] + FirePath[n]
+            Required, _ = FirePathCut(Path, Arcs, ResAtTime, Burning, Delay,
+                                      ArrivalTimeTarget - 2)
+            assert Required == Interdictions(ArrivalTimeTarget - 2 - ArrivalTime[n], Delay)
+
+
+@pytest.mark.parametrize("Seed", range(3))
+def test_rolling_lbbd_objective_equals_one_shot(Seed):
+    Nodes, Arcs, InArcs, OutArcs, Ignitions, Delay, ArrivalTimeTarget, ResAtTime = \
+        Instance(Seed)
+    Previous, Placement = FireLBBD(Nodes, Arcs, ResAtTime, Ignitions, Delay,
+                                   ArrivalTimeTarget, 60, 0, None, False)
+
+    # Re-plan after the first deployment, then evaluate the whole plan
+    Elapsed = 3
+    Committed = set(n for (n, t) in Placement if t <= Elapsed)
+    Burning = BurningAt(Nodes, Arcs, InArcs, OutArcs, Committed, Ignitions, Delay,
+                        Elapsed)
+    Remaining = {t - Elapsed: ResAtTime[t] for t in ResAtTime if t > Elapsed}
+    Model, Rolled = RollingLBBD(Previous, Placement, Burning, Committed, Remaining,
+                                Elapsed, 60, 0)
+    Plan = set(n for (n, t) in Placement if t <= Elapsed) | set(n for (n, t) in Rolled)
+    OneShot, _ = BurnedCount(Nodes, Arcs, OutArcs, Plan, Ignitions, Delay,
+                             ArrivalTimeTarget)
+    assert round(Model.objVal) == OneShot
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the incremental shortest path tree updates
+
+"""
+
+# Packages
+from shortest_paths import ShortestPaths, TreeChildren, SubtreeScores
+from shortest_paths import PlaceResource, RemoveResource, RestoreTree
+from generator import GenerateLandscape
+import random
+import pytest
+
+
+def Instance(Seed):
+    Nodes, Arcs, Ignitions, Delay, ArrivalTimeTarget, ResAtTime = GenerateLandscape(
+        15, 15, 8, "uniform", (1/3, 1), 2, 3, 12, {2: 3, 4: 3}, Seed=Seed)
+    InArcs = {n: [] for n in Nodes}
+    OutArcs = {n: [] for n in Nodes}
+    for a in Arcs:
+        OutArcs[a[0]].append((a[0], a[1]))
+        InArcs[a[1]].append((a[0], a[1]))
+    return Nodes, Arcs, InArcs, OutArcs, Ignitions, Delay, ArrivalTimeTarget
+
+
+# Burned nodes below n, by walking up from every burned node
+def BruteScore(Nodes, ArrivalTime, Pred, ArrivalTimeTarget, n):
+    Count = 0
+    for m in Nodes:
+        if ArrivalTime[m] < ArrivalTimeTarget:
+            u = Pred[m]
+            while u is not None and u != n:
+                u = Pred[u]
+            Count += int(u == n)
+    return Count
+
+
+@pytest.mark.parametrize("Seed", range(10))
+def test_subtree_scores(Seed):
+    Nodes, Arcs, InArcs, OutArcs, Ignitions, Delay, ArrivalTimeTarget = Instance(Seed)
+    Resources = set(random.Random(Seed).sample(Nodes, 6)) - set(Ignitions)
+    ArrivalTime, _, Pred = ShortestPaths(
+        Nodes, Arcs, InArcs, OutArcs, Resources, Ignitions, Delay)
+    Score = SubtreeScores(Nodes, ArrivalTime, TreeChildren(Nodes, Pred), ArrivalTimeTarget)
+    for n in Nodes:
+        assert Score[n] == BruteScore(Nodes, ArrivalTime, Pred, ArrivalTimeTarget, n)
+
+
+@pytest.mark.parametrize("Seed", range(10))
+def test_remove_and_restore_resource(Seed):
+    Nodes, Arcs, InArcs, OutArcs, Ignitions, Delay, ArrivalTimeTarget = Instance(Seed)
+    Resources = set(random.Random(Seed).sample(Nodes, 6)) - set(Ignitions)
+
+    # The tree with all resources, built incrementally
+    Placed = set()
+    ArrivalTime, _, Pred = ShortestPaths(
+        Nodes, Arcs, InArcs, OutArcs, Placed, Ignitions, Delay)
+    Children = TreeChildren(Nodes, Pred)
+    for n in sorted(Resources):
+        PlaceResource(Arcs, InArcs, OutArcs, ArrivalTime, Pred, Children, Placed, n, Delay)
+    Before = (dict(ArrivalTime), dict(Pred))
+
+    for n in sorted(Resources):
+        Changes = RemoveResource(Arcs, OutArcs, ArrivalTime, Pred, Children, Placed,
+                                 n, Delay)
+        Expected, _, __ = ShortestPaths(
+            Nodes, Arcs, InArcs, OutArcs, Resources - {n}, Ignitions, Delay)
+        assert ArrivalTime == pytest.approx(Expected)
+        assert Children == TreeChildren(Nodes, Pred)
+
+        RestoreTree(Changes, ArrivalTime, Pred, Children, Placed, n)
+        assert (ArrivalTime, Pred) == Before and Placed == Resources
+        assert Children == TreeChildren(Nodes, Pred)